@@ -1,31 +1,1000 @@
 import os
+import re
+import sys
 import json
+import math
+import mmap
+import time
 import uuid
+import sqlite3
+import hashlib
+import zipfile
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from shutil import copy2
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 NOTES_FILE = "notes.json"
+HEADERS_FILE = "notes.headers.json"
+HEADERS_VERSION = 2  # rows: id, rev, timestamp, title, content offset, content length
+LOCK_FILE = "notes.lock"
+JOURNAL_FILE = "notes.journal"
+COMPACTING_FILE = JOURNAL_FILE + ".compacting"
 BACKUP_DIR = "backups"
+BACKUP_OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+BACKUP_SNAPSHOTS_DIR = os.path.join(BACKUP_DIR, "snapshots")
+BACKUP_KEEP_HOURLY = 24  # newest backup of each of the last 24 hours
+BACKUP_KEEP_DAILY = 30   # newest backup of each of the last 30 days
+BACKUP_CHAIN_LIMIT = 50  # every 50th backup is a full snapshot, the rest are deltas
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # fold the journal into notes.json past this size
+INDEX_FILE = "notes_index.db"
+BM25_K1 = 1.2
+BM25_B = 0.75
+BULK_WORKERS = 8  # threads for bulk export/import file I/O
+# Windows cannot replace a file that is still mapped, so bodies are read eagerly there
+LAZY_BODIES = os.name != "nt"
+
+class ConflictError(Exception):
+    """A note changed in another process since it was read."""
+
+def _lock_fd(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass  # LK_LOCK gives up after about 10 seconds, keep waiting
+
+def _unlock_fd(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class StoreLock:
+    """Reentrant lock held across the threads of this process and across processes (lock file)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a+b")
+                _lock_fd(self._file)
+            except BaseException:
+                if self._file:
+                    self._file.close()
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_fd(self._file)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+def sync_file(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+def commit_file(tmp_path, path):
+    """Renames a written and fsynced temp file over path, then syncs the directory entry."""
+    os.replace(tmp_path, path)
+    if os.name != "nt":
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# Every mutation is appended to JOURNAL_FILE as one JSON line tagged with a
+# sequence number. notes.json is a snapshot {"seq": N, "notes": [...]}; loading
+# replays the journal records newer than the snapshot on top of it. Writers in
+# every process serialize on LOCK_FILE, and each note carries the seq of its
+# last change as a revision used to detect concurrent edits.
+_store_lock = StoreLock(LOCK_FILE)
+_backup_lock = StoreLock(os.path.join(BACKUP_DIR, "backup.lock"))
+_last_seq = 0
+_compactor = None
+_backup_base = None  # (name, depth, {id: [rev, digest]}) of the newest snapshot we know
+_index_conn = None
+# The loaded notes are kept between menu iterations and re-read only when the
+# files' (mtime, size, inode) change under us; our own writes update both. When
+# only the journal grew, just the new records are replayed from _journal_pos.
+_cache_notes = None
+_cache_sig = None
+_journal_pos = 0
+
+class NoteBodies:
+    """Read-only mmap of a notes.json snapshot that note bodies are decoded from on demand."""
+    __slots__ = ("_file", "_map")
+
+    def __init__(self, f):
+        self._file = f
+        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, offset, length):
+        return json.loads(self._map[offset:offset + length].decode("utf-8"))
+
+class Note:
+    # A note loaded from a snapshot with a headers file only keeps a (bodies,
+    # offset, length) reference; the content is decoded when something asks for it.
+    __slots__ = ("id", "rev", "timestamp", "title", "_content", "_body")
+
+    def __init__(self, id, timestamp, title, content, body=None, rev=0):
+        self.id = id
+        self.rev = rev
+        self.timestamp = timestamp
+        self.title = title
+        self._content = content
+        self._body = body
+
+    @property
+    def content(self):
+        if self._body is not None:
+            bodies, offset, length = self._body
+            return bodies.read(offset, length)
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._body = None
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["id"], d.get("timestamp", ""), d.get("title", ""), d.get("content", ""), rev=d.get("rev", 0))
+
+    def to_dict(self):
+        return {"id": self.id, "rev": self.rev, "timestamp": self.timestamp, "title": self.title,
+                "content": self.content}
+
+class NoteCollection:
+    """Notes in insertion order with O(1) get, replace and delete by id."""
+    __slots__ = ("_by_id",)
+
+    def __init__(self, notes=()):
+        self._by_id = {n.id: n for n in notes}  # dicts keep insertion order
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, nid):
+        return nid in self._by_id
+
+    def get(self, nid):
+        return self._by_id.get(nid)
+
+    def add(self, note):
+        self._by_id[note.id] = note
+
+    def replace(self, note):
+        self._by_id[note.id] = note  # an existing id keeps its position
+
+    def delete(self, nid):
+        return self._by_id.pop(nid, None)
+
+    def to_list(self):
+        return [n.to_dict() for n in self]
 
 def ensure_storage():
     if not os.path.exists(NOTES_FILE):
         with open(NOTES_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
+            json.dump({"seq": 0, "notes": []}, f, ensure_ascii=False, indent=2)
+    for path in (BACKUP_DIR, BACKUP_OBJECTS_DIR, BACKUP_SNAPSHOTS_DIR):
+        if not os.path.exists(path):
+            os.makedirs(path)
+    migrate_legacy_backups()
+    if os.path.exists(COMPACTING_FILE):
+        # a previous compaction was interrupted, finish it before going on
+        compact_journal()
+    migrate_snapshot()
+
+def migrate_snapshot():
+    """Rewrites a notes.json that has no matching headers file (written by an
+    older version, or edited by hand) once, so loads stop parsing every body."""
+    if not LAZY_BODIES:
+        return
+    with _store_lock:
+        with open(NOTES_FILE, "rb") as f:
+            if read_headers(os.fstat(f.fileno())) is not None:
+                return
+        # the journal is left alone: its records are newer than seq and still replay
+        seq, notes = read_snapshot()
+        write_snapshot(notes, seq)
+
+def read_headers(st):
+    """The headers file, if it describes exactly the snapshot with stat result st."""
+    try:
+        with open(HEADERS_FILE, "r", encoding="utf-8") as f:
+            headers = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if (headers.get("version") != HEADERS_VERSION or headers.get("size") != st.st_size
+            or headers.get("mtime_ns") != st.st_mtime_ns):
+        return None
+    return headers
+
+def read_snapshot():
+    f = open(NOTES_FILE, "rb")
+    headers = read_headers(os.fstat(f.fileno())) if LAZY_BODIES else None
+    if headers is not None:
+        # only ids, timestamps and titles are loaded; bodies stay on disk
+        bodies = NoteBodies(f)
+        return headers["seq"], NoteCollection(Note(nid, ts, title, None, (bodies, offset, length), rev)
+                                              for nid, rev, ts, title, offset, length in headers["notes"])
+    with f:
+        data = json.loads(f.read().decode("utf-8"))
+    if isinstance(data, list):  # old format: a plain list of notes
+        data = {"seq": 0, "notes": data}
+    return data["seq"], NoteCollection(Note.from_dict(d) for d in data["notes"])
+
+def apply_record(notes, rec):
+    op = rec["op"]
+    if op == "add":
+        note = Note.from_dict(rec["note"])
+        note.rev = rec["seq"]
+        notes.add(note)
+        return
+    note = notes.get(rec["id"])
+    if note is None:
+        return
+    if op == "append":
+        # ensure newline separation
+        if note.content and not note.content.endswith("\n"):
+            note.content += "\n"
+        note.content += rec["text"]
+        note.timestamp = rec["timestamp"]
+        note.rev = rec["seq"]
+    elif op == "overwrite":
+        title = rec.get("title")
+        if title is None:  # keep the current title
+            title = note.title
+        notes.replace(Note(note.id, rec["timestamp"], title, rec["content"], rev=rec["seq"]))
+    elif op == "delete":
+        notes.delete(note.id)
+
+def replay_journal(notes, path, seq, start=0):
+    """Applies the records of a journal file newer than seq from byte offset start.
+
+    Returns the last seq seen and the offset just past the last complete record.
+    """
+    if not os.path.exists(path):
+        return seq, 0
+    pos = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # torn last line from a crash mid-write
+            rec = json.loads(line)
+            if rec["seq"] > seq:
+                apply_record(notes, rec)
+                seq = rec["seq"]
+            pos += len(line)
+    return seq, pos
 
 def load_notes():
-    with open(NOTES_FILE, "r", encoding="utf-8") as f:
+    global _last_seq, _journal_pos
+    with _store_lock:
+        seq, notes = read_snapshot()
+        seq, _ = replay_journal(notes, COMPACTING_FILE, seq)
+        seq, _journal_pos = replay_journal(notes, JOURNAL_FILE, seq)
+        _last_seq = seq
+        return notes
+
+def files_signature():
+    sig = []
+    for path in (NOTES_FILE, COMPACTING_FILE, JOURNAL_FILE):
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+def get_notes():
+    """The cached notes, caught up with whatever other processes or a restore wrote."""
+    global _cache_notes, _cache_sig, _last_seq, _journal_pos
+    with _store_lock:
+        sig = files_signature()
+        if _cache_notes is not None and sig != _cache_sig and sig[:2] == _cache_sig[:2]:
+            old, new = _cache_sig[2], sig[2]
+            if new is not None and (old is None or (old[2] == new[2] and new[1] >= old[1])):
+                # only the journal grew: replay just the records appended since
+                _last_seq, _journal_pos = replay_journal(_cache_notes, JOURNAL_FILE, _last_seq,
+                                                         _journal_pos if old else 0)
+                _cache_sig = sig
+        if _cache_notes is None or sig != _cache_sig:
+            _cache_notes = load_notes()
+            _cache_sig = sig
+        return _cache_notes
+
+def write_snapshot(notes, seq):
+    # Same layout as json.dump(indent=2), written piece by piece so the byte
+    # span of every content string can go into the headers file. Both files go
+    # through fsynced temp files so a crash never leaves a half-written snapshot.
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=False)
+    tmp_path = NOTES_FILE + ".tmp"
+    rows = []
+    with open(tmp_path, "wb") as f:
+        f.write(f'{{\n  "seq": {seq},\n  "notes": ['.encode("utf-8"))
+        for i, note in enumerate(notes):
+            head = (f'{"," if i else ""}\n    {{\n      "id": {dumps(note.id)},\n'
+                    f'      "rev": {note.rev},\n'
+                    f'      "timestamp": {dumps(note.timestamp)},\n'
+                    f'      "title": {dumps(note.title)},\n      "content": ')
+            f.write(head.encode("utf-8"))
+            body = dumps(note.content).encode("utf-8")
+            rows.append([note.id, note.rev, note.timestamp, note.title, f.tell(), len(body)])
+            f.write(body)
+            f.write(b"\n    }")
+        f.write(b"\n  ]\n}" if rows else b"]\n}")
+        sync_file(f)
+        st = os.fstat(f.fileno())
+    with open(HEADERS_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": HEADERS_VERSION, "seq": seq, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                   "notes": rows}, f, ensure_ascii=False)
+        sync_file(f)
+    commit_file(tmp_path, NOTES_FILE)
+    commit_file(HEADERS_FILE + ".tmp", HEADERS_FILE)
+
+def save_notes(notes, seq=None, base_sig=None):
+    """Backs up and writes a full snapshot of notes, folding in the rotated journal.
+
+    With base_sig the write is skipped (returns False) if notes.json no longer
+    has that signature, i.e. a restore or import replaced the store meanwhile.
+    """
+    global _cache_sig
+    if seq is None:
+        seq = _last_seq
+    backup_snapshot(notes, seq)
+    with _store_lock:
+        sig = files_signature()
+        if base_sig is not None and sig[0] != base_sig:
+            return False
+        write_snapshot(notes, seq)
+        if os.path.exists(COMPACTING_FILE):
+            os.remove(COMPACTING_FILE)
+        if _cache_sig == sig:
+            # the content did not change, keep the cache instead of reloading it
+            _cache_sig = files_signature()
+    return True
+
+# Backups are content-addressed: each distinct note version is stored once
+# under backups/objects/<sha256>. A full snapshot in backups/snapshots lists
+# the object hashes of every note with its id and rev; a .delta.json snapshot
+# only lists the notes changed or removed since its parent snapshot. A note
+# whose rev matches the previous backup is not hashed again, so a backup costs
+# O(changed notes) plus a pass over the revs in memory.
+def store_object(note):
+    blob = json.dumps(note.to_dict(), ensure_ascii=False, sort_keys=True).encode("utf-8")
+    digest = hashlib.sha256(blob).hexdigest()
+    path = os.path.join(BACKUP_OBJECTS_DIR, digest[:2], digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(blob)
+            sync_file(f)
+        commit_file(path + ".tmp", path)
+    return digest
+
+def load_object(digest):
+    with open(os.path.join(BACKUP_OBJECTS_DIR, digest[:2], digest), "r", encoding="utf-8") as f:
+        return Note.from_dict(json.load(f))
+
+def backup_snapshot(notes, seq=None, created=None):
+    """Writes a delta on the newest snapshot, or a full snapshot every
+    BACKUP_CHAIN_LIMIT backups. Old backups are pruned after a full one.
+
+    created is only given when migrating legacy backups; those are always
+    full and never become the base of a delta.
+    """
+    global _backup_base
+    legacy = created is not None
+    if created is None:
+        created = datetime.now()
+    stamp = created.strftime('%Y%m%d_%H%M%S_%f')
+    # other threads and processes back up too; pruning must not race a half-written snapshot
+    with _backup_lock:
+        base = None
+        if not legacy:
+            names = list_backups()
+            base = _backup_base
+            if not names:
+                base = None
+            elif base is None or base[0] != names[-1]:
+                # first backup of this process, or another one backed up since
+                resolved = backup_state(names[-1])
+                base = (names[-1],) + resolved if resolved else None
+        previous = base[2] if base else {}
+        state, changed = {}, {}
+        for note in notes:
+            entry = previous.get(note.id)
+            if entry is None or entry[0] != note.rev:
+                entry = changed[note.id] = [note.rev, store_object(note)]
+            state[note.id] = entry
+        created_text = created.isoformat(sep=" ", timespec="seconds")
+        if base and base[1] + 1 < BACKUP_CHAIN_LIMIT:
+            depth = base[1] + 1
+            name = f"notes_{stamp}.delta.json"
+            manifest = {"created": created_text, "seq": seq, "count": len(state), "parent": base[0],
+                        "changed": changed, "removed": [nid for nid in previous if nid not in state]}
+        else:
+            depth = 0
+            name = f"notes_{stamp}.json"
+            manifest = {"created": created_text, "seq": seq, "notes": [d for _, d in state.values()]}
+            if not legacy:
+                manifest["keys"] = [[nid, rev] for nid, (rev, _) in state.items()]
+        path = os.path.join(BACKUP_SNAPSHOTS_DIR, name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            sync_file(f)
+        commit_file(path + ".tmp", path)
+        if not legacy:
+            _backup_base = (name, depth, state)
+        if depth == 0:
+            prune_backups()
+    return name
+
+def list_backups():
+    """Snapshot names, oldest first."""
+    return sorted(n for n in os.listdir(BACKUP_SNAPSHOTS_DIR) if n.endswith(".json"))
+
+def read_backup(name):
+    with open(os.path.join(BACKUP_SNAPSHOTS_DIR, name), "r", encoding="utf-8") as f:
         return json.load(f)
 
-def save_notes(notes):
-    # backup current file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(BACKUP_DIR, f"notes_{timestamp}.bak.json")
-    copy2(NOTES_FILE, backup_path)
-    # save new
-    with open(NOTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(notes, f, ensure_ascii=False, indent=2)
+def backup_state(name):
+    """(depth, {id: [rev, digest]} in note order) of a snapshot, replaying its
+    deltas on the full snapshot they start from. None for full snapshots
+    without ids (written before deltas, or migrated from legacy backups)."""
+    deltas = []
+    manifest = read_backup(name)
+    while "parent" in manifest:
+        deltas.append(manifest)
+        manifest = read_backup(manifest["parent"])
+    if "keys" not in manifest:
+        return None
+    state = {nid: [rev, digest] for (nid, rev), digest in zip(manifest["keys"], manifest["notes"])}
+    for delta in reversed(deltas):
+        for nid in delta["removed"]:
+            del state[nid]
+        state.update(delta["changed"])
+    return len(deltas), state
+
+def backup_notes(name):
+    """Object hashes of a snapshot's notes, in order."""
+    if not name.endswith(".delta.json"):
+        return read_backup(name)["notes"]
+    return [digest for _, digest in backup_state(name)[1].values()]
+
+def backup_count(manifest):
+    return manifest["count"] if "count" in manifest else len(manifest["notes"])
+
+def backup_time(name):
+    return datetime.strptime(name.split(".")[0], "notes_%Y%m%d_%H%M%S_%f")
+
+def prune_backups():
+    """Applies the hourly/daily retention policy and drops unreferenced objects.
+
+    A kept delta also keeps every snapshot up its chain to the full one.
+    """
+    names = list_backups()[::-1]
+    keep = set(names[:1])
+    hours, days = set(), set()
+    for name in names:
+        created = backup_time(name)
+        hour, day = created.strftime("%Y%m%d%H"), created.strftime("%Y%m%d")
+        if hour not in hours and len(hours) < BACKUP_KEEP_HOURLY:
+            hours.add(hour)
+            keep.add(name)
+        if day not in days and len(days) < BACKUP_KEEP_DAILY:
+            days.add(day)
+            keep.add(name)
+    pending = [n for n in keep if n.endswith(".delta.json")]
+    while pending:
+        parent = read_backup(pending.pop())["parent"]
+        if parent not in keep:
+            keep.add(parent)
+            if parent.endswith(".delta.json"):
+                pending.append(parent)
+    expired = [n for n in names if n not in keep]
+    if not expired:
+        return
+    for name in expired:
+        os.remove(os.path.join(BACKUP_SNAPSHOTS_DIR, name))
+    live = set()
+    for name in keep:
+        manifest = read_backup(name)
+        live.update(manifest.get("notes", ()))
+        live.update(digest for _, digest in manifest.get("changed", {}).values())
+    for prefix in os.listdir(BACKUP_OBJECTS_DIR):
+        folder = os.path.join(BACKUP_OBJECTS_DIR, prefix)
+        for digest in os.listdir(folder):
+            if digest not in live:
+                os.remove(os.path.join(folder, digest))
+
+def migrate_legacy_backups():
+    """Converts old full-copy notes_<timestamp>.bak.json files into snapshots."""
+    for name in sorted(os.listdir(BACKUP_DIR)):
+        if not name.endswith(".bak.json"):
+            continue
+        path = os.path.join(BACKUP_DIR, name)
+        try:
+            created = datetime.strptime(name, "notes_%Y%m%d_%H%M%S.bak.json")
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError:
+            continue
+        if isinstance(data, list):
+            data = {"seq": 0, "notes": data}
+        backup_snapshot([Note.from_dict(d) for d in data["notes"]], data["seq"], created)
+        os.remove(path)
+
+def restore_backup(name):
+    """Rebuilds notes.json and the search index as of the given snapshot. The
+    current state is backed up first."""
+    global _last_seq, _cache_notes, _cache_sig, _journal_pos
+    wait_for_compaction()
+    notes = NoteCollection(load_object(d) for d in backup_notes(name))
+    with _store_lock:
+        backup_snapshot(get_notes(), _last_seq)
+        # keep the seq counter moving forward so no old journal record replays
+        _last_seq += 1
+        write_snapshot(notes, _last_seq)
+        for path in (JOURNAL_FILE, COMPACTING_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        _cache_notes = notes
+        _cache_sig = files_signature()
+        _journal_pos = 0
+        rebuild_index(notes)
+    return notes
+
+def checkpoint_notes(notes):
+    """Writes notes as a fresh snapshot and empties the journal, for bulk changes."""
+    global _last_seq, _cache_notes, _cache_sig, _journal_pos
+    wait_for_compaction()
+    with _store_lock:
+        _last_seq += 1
+        save_notes(notes, _last_seq)
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        _cache_notes = notes
+        _cache_sig = files_signature()
+        _journal_pos = 0
+
+def compact_journal():
+    """Folds the rotated journal into a new notes.json snapshot."""
+    with _store_lock:
+        if not os.path.exists(COMPACTING_FILE):
+            return  # another process finished it
+        base_sig = files_signature()[0]
+        seq, notes = read_snapshot()
+        seq, _ = replay_journal(notes, COMPACTING_FILE, seq)
+    save_notes(notes, seq, base_sig)
+
+def check_id(nid):
+    """Note ids end up in file names (note_<id>.txt), so they must be plain strings."""
+    if not isinstance(nid, str) or not nid:
+        raise ValueError(f"a note ID must be a non-empty string, not {nid!r}")
+    if nid in (".", "..") or "/" in nid or "\\" in nid or "\0" in nid:
+        raise ValueError(f"a note ID cannot contain path separators: {nid!r}")
+
+def check_text(value, field):
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string, not {type(value).__name__}")
+
+def check_record(record):
+    """Rejects a journal record whose fields would not load back as a note."""
+    op = record["op"]
+    if op == "add":
+        note = record["note"]
+        check_id(note["id"])
+        for field in ("timestamp", "title", "content"):
+            check_text(note[field], field)
+        return
+    check_id(record["id"])
+    if op == "append":
+        check_text(record["text"], "text")
+    elif op == "overwrite":
+        check_text(record["content"], "content")
+        if record.get("title") is not None:
+            check_text(record["title"], "title")
+
+def check_change(notes, record, base_rev):
+    check_record(record)
+    if record["op"] == "add":
+        nid = record["note"]["id"]
+        if nid in notes:
+            raise ConflictError(f"a note with ID {nid} already exists")
+        return nid
+    nid = record["id"]
+    current = notes.get(nid)
+    if current is None:
+        raise ConflictError(f"note {nid} not found")
+    if base_rev is not None and record["op"] != "append" and current.rev != base_rev:
+        raise ConflictError(f"note {nid} was changed by another process")
+    return nid
+
+def log_changes(changes):
+    """Appends mutations to the journal in one write and applies them to the cached notes and search index.
+
+    changes is a list of (record, base_rev) pairs. The cache first catches up
+    with other processes under the store lock. A malformed record raises
+    ValueError, and an overwrite or delete of a note whose rev is no longer
+    base_rev raises ConflictError; either way nothing is written. Appends are
+    merged onto the latest content. Returns the notes.
+    """
+    global _last_seq, _compactor, _cache_notes, _cache_sig, _journal_pos
+    with _store_lock:
+        notes = get_notes()
+        base_seq = _last_seq
+        touched = []
+        lines = []
+        try:
+            for record, base_rev in changes:
+                touched.append(check_change(notes, record, base_rev))
+                _last_seq += 1
+                record["seq"] = _last_seq
+                apply_record(notes, record)
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            with open(JOURNAL_FILE, "ab") as f:
+                if f.tell() > _journal_pos:
+                    f.truncate(_journal_pos)  # drop a torn record left by a crashed writer
+                f.write("".join(lines).encode("utf-8"))
+                sync_file(f)
+                _journal_pos = f.tell()
+        except BaseException:
+            # the cache already holds part of the batch, reload it from disk
+            _cache_notes = None
+            get_notes()
+            raise
+        touched = list(dict.fromkeys(touched))
+        update_index(notes, [notes.get(nid) for nid in touched if nid in notes],
+                     [nid for nid in touched if nid not in notes], base_seq)
+        compacting = _compactor is not None and _compactor.is_alive()
+        if _journal_pos >= JOURNAL_COMPACT_BYTES and not compacting and not os.path.exists(COMPACTING_FILE):
+            # new writes go to a fresh journal while the old one is folded in
+            os.replace(JOURNAL_FILE, COMPACTING_FILE)
+            _journal_pos = 0
+            _compactor = threading.Thread(target=compact_journal, daemon=True)
+            _compactor.start()
+        _cache_sig = files_signature()
+        return notes
+
+def log_change(record, base_rev=None):
+    """Journals a single mutation, see log_changes."""
+    return log_changes([(record, base_rev)])
+
+def wait_for_compaction():
+    if _compactor is not None:
+        _compactor.join()
+
+# Full-text search uses an inverted index (token -> note ids with token
+# positions) kept in SQLite next to the notes. It is updated note by note on
+# every change and remembers the journal seq it matches, so a stale index
+# (crash, restore, another process) is detected and rebuilt on load.
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def note_tokens(note):
+    # a gap between title and content keeps phrases from spanning both
+    return tokenize(note.title) + [None] + tokenize(note.content)
+
+def index_db():
+    global _index_conn
+    if _index_conn is None:
+        _index_conn = sqlite3.connect(INDEX_FILE)
+        _index_conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS docs (note_id TEXT PRIMARY KEY, length INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                note_id TEXT NOT NULL,
+                positions TEXT NOT NULL,
+                PRIMARY KEY (token, note_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_note ON postings(note_id);
+        """)
+    return _index_conn
+
+def index_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+    return row[0] if row else 0
+
+def set_index_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+def _unindex(conn, nid):
+    row = conn.execute("SELECT length FROM docs WHERE note_id=?", (nid,)).fetchone()
+    if row:
+        set_index_meta(conn, "total_length", index_meta(conn, "total_length") - row[0])
+        conn.execute("DELETE FROM docs WHERE note_id=?", (nid,))
+        conn.execute("DELETE FROM postings WHERE note_id=?", (nid,))
+
+def _index(conn, note):
+    positions = {}
+    tokens = note_tokens(note)
+    for pos, token in enumerate(tokens):
+        if token is not None:
+            positions.setdefault(token, []).append(pos)
+    length = len(tokens) - 1
+    conn.execute("INSERT INTO docs (note_id, length) VALUES (?, ?)", (note.id, length))
+    conn.executemany("INSERT INTO postings (token, note_id, positions) VALUES (?, ?, ?)",
+                     [(t, note.id, json.dumps(p)) for t, p in positions.items()])
+    set_index_meta(conn, "total_length", index_meta(conn, "total_length") + length)
+
+def update_index(notes, changed, removed_ids, base_seq):
+    """Re-indexes added/changed notes and drops deleted ones in one transaction.
+
+    Costs O(change), not O(corpus). base_seq is the seq before the change; an
+    index that was not at base_seq already missed something (a crash between
+    journal and index, a restore) and is rebuilt from notes instead.
+    """
+    conn = index_db()
+    if index_meta(conn, "seq") != base_seq:
+        rebuild_index(notes)
+        return
+    with conn:
+        for note in changed:
+            _unindex(conn, note.id)
+            _index(conn, note)
+        for nid in removed_ids:
+            _unindex(conn, nid)
+        set_index_meta(conn, "seq", _last_seq)
+
+def rebuild_index(notes):
+    conn = index_db()
+    with conn:
+        conn.execute("DELETE FROM docs")
+        conn.execute("DELETE FROM postings")
+        set_index_meta(conn, "total_length", 0)
+        for note in notes:
+            _index(conn, note)
+        set_index_meta(conn, "seq", _last_seq)
+
+def sync_index(notes):
+    if index_meta(index_db(), "seq") != _last_seq:
+        rebuild_index(notes)
+
+def parse_query(q):
+    """Splits a query into terms: "quoted phrases", prefix* and plain words."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', q):
+        if phrase:
+            tokens = tokenize(phrase)
+            if tokens:
+                terms.append(("phrase", tokens))
+        elif word.endswith("*") and tokenize(word):
+            terms.append(("prefix", tokenize(word)[0]))
+        else:
+            terms.extend(("word", t) for t in tokenize(word))
+    return terms
+
+def _postings(conn, token):
+    rows = conn.execute("SELECT note_id, positions FROM postings WHERE token=?", (token,))
+    return {nid: json.loads(p) for nid, p in rows}
+
+def _prefix_postings(conn, prefix):
+    matches = {}
+    rows = conn.execute("SELECT token, note_id, positions FROM postings WHERE token >= ? AND token < ?",
+                        (prefix, prefix + "\U0010ffff"))
+    for token, nid, p in rows:
+        matches.setdefault(token, {})[nid] = json.loads(p)
+    return matches
+
+def _phrase_hits(conn, tokens):
+    """Postings of a phrase: the positions where the whole phrase starts."""
+    lists = [_postings(conn, t) for t in tokens]
+    hits = {}
+    for nid in set.intersection(*(set(p) for p in lists)):
+        starts = set(lists[0][nid])
+        for offset, postings in enumerate(lists[1:], 1):
+            starts &= {pos - offset for pos in postings[nid]}
+        if starts:
+            hits[nid] = sorted(starts)
+    return hits
+
+def query_index(q, limit=None):
+    """Ranks notes matching every term of q with BM25. Returns [(note_id, score)]."""
+    terms = parse_query(q)
+    if not terms:
+        return []
+    conn = index_db()
+    n_docs = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    if not n_docs:
+        return []
+    avg_len = index_meta(conn, "total_length") / n_docs or 1
+    # each term contributes one or more postings lists (a prefix expands to many tokens)
+    term_postings = []
+    for kind, value in terms:
+        if kind == "word":
+            term_postings.append([_postings(conn, value)])
+        elif kind == "prefix":
+            term_postings.append(list(_prefix_postings(conn, value).values()))
+        else:
+            term_postings.append([_phrase_hits(conn, value)])
+    candidates = None
+    for lists in term_postings:
+        ids = set().union(*lists)
+        candidates = ids if candidates is None else candidates & ids
+    if not candidates:
+        return []
+    lengths = {}
+    ids = list(candidates)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = conn.execute(f"SELECT note_id, length FROM docs WHERE note_id IN ({','.join('?' * len(chunk))})", chunk)
+        lengths.update(rows)
+    scores = dict.fromkeys(candidates, 0.0)
+    for lists in term_postings:
+        for postings in lists:
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for nid in candidates & postings.keys():
+                tf = len(postings[nid])
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[nid] / avg_len)
+                scores[nid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:limit] if limit else ranked
+
+class Progress:
+    """Prints done/total and the throughput every `every` items and at the end."""
+
+    def __init__(self, label, total, every=1000):
+        self.label = label
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.start = time.perf_counter()
+
+    def step(self):
+        self.done += 1
+        if self.done % self.every == 0 or self.done == self.total:
+            elapsed = time.perf_counter() - self.start
+            rate = self.done / elapsed if elapsed else 0
+            print(f"{self.label}: {self.done}/{self.total} ({rate:,.0f} notes/s)")
+
+def run_in_pool(fn, items, progress):
+    """Runs fn over items on a thread pool, keeping only a few tasks in flight at once."""
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        pending = set()
+        for item in items:
+            pending.add(pool.submit(fn, item))
+            if len(pending) >= BULK_WORKERS * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fut.result()
+                    progress.step()
+        for fut in wait(pending).done:
+            fut.result()
+            progress.step()
+
+def note_txt(note):
+    return f"{note.title}\n{note.timestamp}\n\n{note.content}"
+
+def parse_note_txt(filename, text):
+    """Reads the layout written by note_txt; anything else becomes a note titled after the file."""
+    parts = text.split("\n", 3)
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    nid = stem[len("note_"):] if stem.startswith("note_") else None
+    if len(parts) >= 3 and parts[2] == "":
+        return {"id": nid, "title": parts[0], "timestamp": parts[1], "content": parts[3] if len(parts) == 4 else ""}
+    return {"id": nid, "title": stem, "content": text}
+
+def export_notes(notes, fmt, target, query=""):
+    """Streams all notes, or those matching a search query, to a .txt folder, a JSONL file or a zip."""
+    if query:
+        sync_index(notes)
+        selected = [note for note in (notes.get(nid) for nid, _ in query_index(query)) if note is not None]
+    else:
+        selected = notes
+    progress = Progress("Exported", len(selected))
+    if fmt == "txt":
+        os.makedirs(target, exist_ok=True)
+        def write_one(note):
+            with open(os.path.join(target, f"note_{note.id}.txt"), "w", encoding="utf-8") as f:
+                f.write(note_txt(note))
+        run_in_pool(write_one, selected, progress)
+    elif fmt == "jsonl":
+        with open(target, "w", encoding="utf-8") as f:
+            for note in selected:
+                f.write(json.dumps(note.to_dict(), ensure_ascii=False) + "\n")
+                progress.step()
+    elif fmt == "zip":
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+            for note in selected:
+                zf.writestr(f"note_{note.id}.txt", note_txt(note))
+                progress.step()
+    else:
+        raise ValueError(f"unknown export format: {fmt}")
+    return len(selected)
+
+def clean_import(d, where):
+    """Checks one imported note: the id is kept only if it is a valid note ID,
+    and title, content and timestamp must be strings or missing."""
+    try:
+        nid = d.get("id")
+        if nid is not None and nid != "":
+            check_id(nid)
+        for field in ("timestamp", "title", "content"):
+            if d.get(field) is not None:
+                check_text(d[field], field)
+    except ValueError as e:
+        raise ValueError(f"{where}: {e}") from None
+    return {"id": nid or None, "timestamp": d.get("timestamp"), "title": d.get("title") or "",
+            "content": d.get("content") or ""}
+
+def read_import(source):
+    """Parses every note of a .txt folder, a zip of .txt files or a JSONL file into
+    checked dicts; raises ValueError naming the first bad note."""
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(source, n) for n in os.listdir(source) if n.endswith(".txt"))
+        def read_one(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return clean_import(parse_note_txt(path, f.read()), path)
+        with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+            return list(pool.map(read_one, paths))
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            return [clean_import(parse_note_txt(n, zf.read(n).decode("utf-8")), n)
+                    for n in zf.namelist() if n.endswith(".txt")]
+    records = []
+    with open(source, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            if not isinstance(d, dict):
+                raise ValueError(f"line {lineno}: expected a JSON object")
+            records.append(clean_import(d, f"line {lineno}"))
+    return records
+
+def import_notes(source):
+    """Adds every note of source as one transaction: one snapshot write and one backup."""
+    incoming = read_import(source)  # parse everything first so a bad file changes nothing
+    progress = Progress("Imported", len(incoming))
+    added = []
+    wait_for_compaction()
+    with _store_lock:
+        notes = get_notes()
+        base_seq = _last_seq
+        rev = base_seq + 1  # the seq checkpoint_notes gives the new snapshot
+        for d in incoming:
+            nid = d.get("id")
+            if not nid or nid in notes:
+                nid = str(uuid.uuid4())[:8]
+            timestamp = d.get("timestamp") or datetime.now().isoformat(sep=" ", timespec="seconds")
+            note = Note(nid, timestamp, d["title"], d["content"], rev=rev)
+            notes.add(note)
+            added.append(note)
+            progress.step()
+        checkpoint_notes(notes)
+        update_index(notes, added, (), base_seq)
+    return len(added)
 
 def multline_input(prompt="Type your content (type 'END' on a line alone to finish):"):
     print(prompt)
@@ -41,123 +1010,264 @@ def multline_input(prompt="Type your content (type 'END' on a line alone to fini
         lines.append(line)
     return "\n".join(lines)
 
-def list_notes(notes):
+class NoteStore:
+    """Non-interactive access to the notes. Each call is one load/save cycle,
+    so a batch passed to apply() costs one journal write however large it is."""
+
+    def __init__(self):
+        ensure_storage()
+        sync_index(get_notes())
+
+    @property
+    def notes(self):
+        return get_notes()
+
+    def get(self, nid):
+        return get_notes().get(nid)
+
+    def list(self, offset=0, limit=None):
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(get_notes(), offset, stop))
+
+    def search(self, query, limit=None):
+        notes = get_notes()
+        sync_index(notes)
+        hits = ((notes.get(nid), score) for nid, score in query_index(query, limit))
+        return [(note, score) for note, score in hits if note is not None]
+
+    def add(self, title, content):
+        return self.get(self.apply([{"op": "add", "title": title, "content": content}])[0])
+
+    def append(self, nid, text):
+        self.apply([{"op": "append", "id": nid, "text": text}])
+        return self.get(nid)
+
+    def overwrite(self, nid, content, title=None, rev=None):
+        self.apply([{"op": "overwrite", "id": nid, "title": title, "content": content, "rev": rev}])
+        return self.get(nid)
+
+    def delete(self, nid, rev=None):
+        self.apply([{"op": "delete", "id": nid, "rev": rev}])
+
+    def apply(self, ops):
+        """Applies a batch of operations atomically and returns the ids they touched.
+
+        Each op is a dict: {"op": "add", "title", "content"[, "id"]},
+        {"op": "append", "id", "text"}, {"op": "overwrite", "id", "content"[, "title"]}
+        or {"op": "delete", "id"}. Overwrite and delete accept a "rev" read
+        earlier and fail with ConflictError if the note changed since.
+        Every op is checked before anything is written: ids, titles, contents
+        and texts must be strings (title, content and text may be None).
+        """
+        now = datetime.now().isoformat(sep=" ", timespec="seconds")
+        changes = []
+        for op in ops:
+            if not isinstance(op, dict):
+                raise ValueError(f"an operation must be an object, not {op!r}")
+            kind = op.get("op")
+            for field in ("title", "content", "text"):
+                if op.get(field) is not None:
+                    check_text(op[field], field)
+            if kind == "add":
+                nid = op.get("id")
+                if nid is not None:
+                    check_id(nid)
+                note = {"id": nid or str(uuid.uuid4())[:8], "timestamp": now,
+                        "title": op.get("title") or "", "content": op.get("content") or ""}
+                changes.append(({"op": "add", "note": note}, None))
+                continue
+            if kind not in ("append", "overwrite", "delete"):
+                raise ValueError(f"unknown operation: {kind!r}")
+            if not op.get("id"):
+                raise ValueError(f"{kind} needs an id")
+            check_id(op["id"])
+            record = {"op": kind, "id": op["id"]}
+            if kind == "append":
+                record.update(text=op.get("text") or "", timestamp=now)
+            elif kind == "overwrite":
+                record.update(title=op.get("title"), content=op.get("content") or "", timestamp=now)
+            changes.append((record, op.get("rev")))
+        if any(record["op"] in ("overwrite", "delete") for record, _ in changes):
+            backup_snapshot(get_notes(), _last_seq)
+        log_changes(changes)
+        return [record["note"]["id"] if record["op"] == "add" else record["id"] for record, _ in changes]
+
+    def export_to(self, fmt, target, query=""):
+        return export_notes(get_notes(), fmt, target, query)
+
+    def import_from(self, source):
+        return import_notes(source)
+
+    def restore(self, name):
+        return len(restore_backup(name))
+
+    def rebuild_index(self):
+        rebuild_index(get_notes())
+
+    def close(self):
+        wait_for_compaction()
+
+def list_notes(store):
+    notes = store.notes
     if not notes:
         print("No notes found.")
         return
     print("\n--- Notes List ---")
     for note in notes:
-        ts = note.get("timestamp", "")
-        title = note.get("title", "")
-        nid = note.get("id")
-        print(f"{nid} | {ts} | {title}")
+        print(f"{note.id} | {note.timestamp} | {note.title}")
     print("--- End of List ---\n")
 
-def view_note(notes):
+def view_note(store):
     nid = input("Enter the ID of the note to view: ").strip()
-    note = next((n for n in notes if n["id"] == nid), None)
+    note = store.get(nid)
     if not note:
         print("Note not found.")
         return
     print(f"\n--- Note {nid} ---")
-    print(f"Date: {note['timestamp']}")
-    print(f"Title: {note['title']}")
+    print(f"Date: {note.timestamp}")
+    print(f"Title: {note.title}")
     print("--- Content ---")
-    print(note["content"])
+    print(note.content)
     print("--- End of Note ---\n")
 
-def add_note(notes):
+def add_note(store):
     title = input("Note title: ").strip()
     content = multline_input("Type the content. Type 'END' to finish:")
     if content is None:
         return
-    note = {
-        "id": str(uuid.uuid4())[:8],
-        "timestamp": datetime.now().isoformat(sep=" ", timespec="seconds"),
-        "title": title,
-        "content": content
-    }
-    notes.append(note)
-    save_notes(notes)
-    print(f"Note added with ID {note['id']}.")
-
-def append_to_note(notes):
+    note = store.add(title, content)
+    print(f"Note added with ID {note.id}.")
+
+def append_to_note(store):
     nid = input("ID of the note to append to: ").strip()
-    note = next((n for n in notes if n["id"] == nid), None)
-    if not note:
+    if store.get(nid) is None:
         print("Note not found.")
         return
     addition = multline_input("Type the text to append. Type 'END' to finish:")
     if addition is None:
         return
-    # ensure newline separation
-    if note["content"] and not note["content"].endswith("\n"):
-        note["content"] += "\n"
-    note["content"] += addition
-    note["timestamp"] = datetime.now().isoformat(sep=" ", timespec="seconds")
-    save_notes(notes)
+    try:
+        store.append(nid, addition)
+    except ConflictError as e:
+        print(f"Nothing was appended: {e}.")
+        return
     print("Content appended successfully.")
 
-def overwrite_note(notes):
+def overwrite_note(store):
     nid = input("ID of the note to overwrite: ").strip()
-    idx = next((i for i,n in enumerate(notes) if n["id"] == nid), None)
-    if idx is None:
+    old = store.get(nid)
+    if old is None:
         print("Note not found.")
         return
+    rev = old.rev
     print("This will overwrite the note. A backup is automatically created.")
     new_title = input("New title (leave empty to keep current): ").strip()
     new_content = multline_input("Type the new content. Type 'END' to finish:")
     if new_content is None:
         return
-    if new_title:
-        notes[idx]["title"] = new_title
-    notes[idx]["content"] = new_content
-    notes[idx]["timestamp"] = datetime.now().isoformat(sep=" ", timespec="seconds")
-    save_notes(notes)
+    try:
+        store.overwrite(nid, new_content, new_title or None, rev)
+    except ConflictError as e:
+        print(f"Note not overwritten: {e}. View it again and retry.")
+        return
     print("Note overwritten successfully.")
 
-def delete_note(notes):
+def delete_note(store):
     nid = input("ID of the note to delete: ").strip()
-    note = next((n for n in notes if n["id"] == nid), None)
+    note = store.get(nid)
     if not note:
         print("Note not found.")
         return
-    confirm = input(f"Are you sure you want to delete the note '{note['title']}'? (yes/no): ").strip().lower()
+    rev = note.rev
+    confirm = input(f"Are you sure you want to delete the note '{note.title}'? (yes/no): ").strip().lower()
     if confirm in ("yes","y"):
-        notes[:] = [n for n in notes if n["id"] != nid]
-        save_notes(notes)
+        try:
+            store.delete(nid, rev)
+        except ConflictError as e:
+            print(f"Note not deleted: {e}.")
+            return
         print("Note deleted.")
     else:
         print("Operation canceled.")
 
-def search_notes(notes):
-    q = input("Type text to search (in title or content): ").strip().lower()
-    results = [n for n in notes if q in n.get("title","").lower() or q in n.get("content","").lower()]
+def search_notes(store):
+    q = input('Type words to search (use "quotes" for phrases, word* for prefixes): ').strip()
+    results = store.search(q)
     if not results:
         print("No matches found.")
         return
     print(f"\nFound {len(results)} match(es):")
-    for n in results:
-        print(f"{n['id']} | {n['timestamp']} | {n['title']}")
+    for n, score in results:
+        print(f"{n.id} | {n.timestamp} | {n.title} | score {score:.2f}")
     print()
 
-def export_note_txt(notes):
+def rebuild_search_index(store):
+    store.rebuild_index()
+    print(f"Search index rebuilt ({len(store.notes)} note(s)).")
+
+def export_note_txt(store):
     nid = input("ID of the note to export as .txt: ").strip()
-    note = next((n for n in notes if n["id"] == nid), None)
+    note = store.get(nid)
     if not note:
         print("Note not found.")
         return
     filename = f"note_{nid}.txt"
     with open(filename, "w", encoding="utf-8") as f:
-        f.write(f"{note['title']}\n")
-        f.write(f"{note['timestamp']}\n\n")
-        f.write(note['content'])
+        f.write(note_txt(note))
     print(f"Note exported as {filename}")
 
+def restore_notes(store):
+    names = list_backups()
+    if not names:
+        print("No backups found.")
+        return
+    print("\n--- Backups ---")
+    for i, name in enumerate(names, 1):
+        manifest = read_backup(name)
+        print(f"{i}. {manifest['created']} | {backup_count(manifest)} note(s)")
+    choice = input("Number of the backup to restore (leave empty to cancel): ").strip()
+    if not choice:
+        print("Operation canceled.")
+        return
+    if not choice.isdigit() or not 1 <= int(choice) <= len(names):
+        print("Backup not found.")
+        return
+    confirm = input("The current notes will be replaced (a backup is made first). Continue? (yes/no): ").strip().lower()
+    if confirm in ("yes","y"):
+        count = store.restore(names[int(choice) - 1])
+        print(f"Restored {count} note(s).")
+    else:
+        print("Operation canceled.")
+
+def bulk_export(store):
+    fmt = input("Export format (txt/jsonl/zip): ").strip().lower()
+    if fmt not in ("txt", "jsonl", "zip"):
+        print("Unknown format.")
+        return
+    target = input("Target folder (txt) or file (jsonl/zip): ").strip()
+    if not target:
+        print("Operation canceled.")
+        return
+    query = input("Only export notes matching this search (leave empty for all): ").strip()
+    count = store.export_to(fmt, target, query)
+    print(f"{count} note(s) exported to {target}")
+
+def bulk_import(store):
+    source = input("Folder of .txt notes, .zip archive or .jsonl file to import: ").strip()
+    if not os.path.exists(source):
+        print("Source not found.")
+        return
+    try:
+        count = store.import_from(source)
+    except (ValueError, UnicodeDecodeError) as e:
+        print(f"Import failed, no notes were added: {e}")
+        return
+    print(f"{count} note(s) imported.")
+
 def main_menu():
-    ensure_storage()
+    store = NoteStore()
     while True:
-        notes = load_notes()
+        sync_index(store.notes)
         print("\n--- NOTE MANAGER ---")
         print("1. List notes")
         print("2. View note")
@@ -167,29 +1277,133 @@ def main_menu():
         print("6. Search notes")
         print("7. Delete note")
         print("8. Export note to .txt")
-        print("9. Exit")
-        option = input("Choose an option (1-9): ").strip()
+        print("9. Restore from backup")
+        print("10. Rebuild search index")
+        print("11. Export notes in bulk")
+        print("12. Import notes in bulk")
+        print("13. Exit")
+        option = input("Choose an option (1-13): ").strip()
         if option == "1":
-            list_notes(notes)
+            list_notes(store)
         elif option == "2":
-            view_note(notes)
+            view_note(store)
         elif option == "3":
-            add_note(notes)
+            add_note(store)
         elif option == "4":
-            append_to_note(notes)
+            append_to_note(store)
         elif option == "5":
-            overwrite_note(notes)
+            overwrite_note(store)
         elif option == "6":
-            search_notes(notes)
+            search_notes(store)
         elif option == "7":
-            delete_note(notes)
+            delete_note(store)
         elif option == "8":
-            export_note_txt(notes)
+            export_note_txt(store)
         elif option == "9":
+            restore_notes(store)
+        elif option == "10":
+            rebuild_search_index(store)
+        elif option == "11":
+            bulk_export(store)
+        elif option == "12":
+            bulk_import(store)
+        elif option == "13":
+            store.close()
             print("Goodbye!")
             break
         else:
             print("Invalid option. Try again.")
 
+def read_text_arg(value):
+    return sys.stdin.read() if value is None else value
+
+def read_operations(path):
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    ops = []
+    with f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            op = json.loads(line)
+            if not isinstance(op, dict):
+                raise ValueError(f"line {lineno}: expected a JSON object")
+            ops.append(op)
+    return ops
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(
+        description="JSON note manager. Run it without arguments for the interactive menu.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="list notes as 'id | date | title'")
+    p.add_argument("--offset", type=int, default=0)
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("get", help="print notes as JSON lines")
+    p.add_argument("ids", nargs="+")
+    p = sub.add_parser("add", help="add a note, the content is read from stdin without --content")
+    p.add_argument("--title", default="")
+    p.add_argument("--content")
+    p = sub.add_parser("append", help="append the same text to one or more notes")
+    p.add_argument("ids", nargs="+")
+    p.add_argument("--text", required=True)
+    p = sub.add_parser("overwrite", help="replace a note's content, read from stdin without --content")
+    p.add_argument("id")
+    p.add_argument("--title")
+    p.add_argument("--content")
+    p.add_argument("--rev", type=int, help="fail if the note's rev is no longer this one")
+    p = sub.add_parser("delete", help="delete one or more notes")
+    p.add_argument("ids", nargs="+")
+    p = sub.add_parser("search", help="ranked full-text search")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("apply", help="apply a JSONL file of operations ('-' for stdin) as one batch")
+    p.add_argument("file")
+    p = sub.add_parser("export", help="export notes to a .txt folder, a JSONL file or a zip")
+    p.add_argument("format", choices=("txt", "jsonl", "zip"))
+    p.add_argument("target")
+    p.add_argument("--query", default="", help="only export notes matching this search")
+    p = sub.add_parser("import", help="import a .txt folder, a zip or a JSONL file")
+    p.add_argument("source")
+    sub.add_parser("rebuild-index", help="rebuild the search index")
+    args = parser.parse_args(argv)
+
+    store = NoteStore()
+    try:
+        if args.command == "list":
+            for note in store.list(args.offset, args.limit):
+                print(f"{note.id} | {note.timestamp} | {note.title}")
+        elif args.command == "get":
+            for nid in args.ids:
+                note = store.get(nid)
+                if note is None:
+                    raise ValueError(f"note {nid} not found")
+                print(json.dumps(note.to_dict(), ensure_ascii=False))
+        elif args.command == "add":
+            print(store.add(args.title, read_text_arg(args.content)).id)
+        elif args.command == "append":
+            store.apply([{"op": "append", "id": nid, "text": args.text} for nid in args.ids])
+        elif args.command == "overwrite":
+            store.overwrite(args.id, read_text_arg(args.content), args.title, args.rev)
+        elif args.command == "delete":
+            store.apply([{"op": "delete", "id": nid} for nid in args.ids])
+        elif args.command == "search":
+            for note, score in store.search(args.query, args.limit):
+                print(f"{note.id} | {note.timestamp} | {note.title} | score {score:.2f}")
+        elif args.command == "apply":
+            ids = store.apply(read_operations(args.file))
+            print(f"Applied {len(ids)} operation(s).")
+        elif args.command == "export":
+            store.export_to(args.format, args.target, args.query)
+        elif args.command == "import":
+            store.import_from(args.source)
+        elif args.command == "rebuild-index":
+            store.rebuild_index()
+    except (ConflictError, ValueError, OSError) as e:
+        parser.exit(1, f"error: {e}\n")
+    finally:
+        store.close()
+
 if __name__ == "__main__":
-    main_menu()
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+    else:
+        main_menu()
@@ -8,7 +8,9 @@ from kivy.uix.image import Image
 from kivy.core.window import Window
 from kivy.properties import StringProperty
 from kivy.graphics import Color, Rectangle
+from kivy.loader import Loader
 import os
+from collections import OrderedDict
 from kivy.utils import platform
 
 # --- Mobile-like screen size for desktop testing ---
@@ -16,6 +18,50 @@ if platform in ("win","linux", "macosx"):
     Window.size = (360, 640)
     Window.clearcolor = (0, 0, 0, 1)
 
+# --- Memory: only pages near the current one exist ---
+PRELOAD_PAGES = 2        # Pages built (and their images decoded) ahead of and behind the current one
+KEEP_PAGES = 3           # Built pages further away than this are dropped
+TEXTURE_CACHE_SIZE = 6   # Decoded images kept in memory
+
+class TextureCache:
+    """LRU cache of image textures.
+
+    Images are decoded by Kivy's Loader in background threads; the texture is
+    handed to the callbacks once it is ready, so the UI never waits on a JPEG.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._textures = OrderedDict()
+        self._loading = {}
+        self._waiting = {}
+
+    def request(self, source, callback=None):
+        texture = self._textures.get(source)
+        if texture is not None:
+            self._textures.move_to_end(source)
+            if callback:
+                callback(texture)
+            return
+        if callback:
+            self._waiting.setdefault(source, []).append(callback)
+        if source in self._loading:
+            return
+        proxy = Loader.image(source, nocache=True)  # this cache is the only one
+        self._loading[source] = proxy
+        proxy.bind(on_load=lambda p: self._on_load(source, p),
+                   on_error=lambda p: self._loading.pop(source, None))
+
+    def _on_load(self, source, proxy):
+        self._loading.pop(source, None)
+        texture = proxy.image.texture
+        self._textures[source] = texture
+        while len(self._textures) > self.size:
+            self._textures.popitem(last=False)
+        for callback in self._waiting.pop(source, []):
+            callback(texture)
+
+textures = TextureCache(TEXTURE_CACHE_SIZE)
+
 class StoryPage(Screen):
     image_source = StringProperty('')
     story_text = StringProperty('')
@@ -31,8 +77,9 @@ class StoryPage(Screen):
         if image_source:
             img_box = BoxLayout(size_hint_y=0.6)
             if os.path.isfile(image_source):
-                img = Image(source=image_source, allow_stretch=True, keep_ratio=True)
+                img = Image(allow_stretch=True, keep_ratio=True, opacity=0)  # hidden until decoded
                 img_box.add_widget(img)
+                textures.request(image_source, lambda texture: self._show_texture(img, texture))
             else:
                 img_box.add_widget(Label(text=f"[Image not found]\n{image_source}", halign='center', valign='middle', markup=True))
             root.add_widget(img_box)
@@ -81,68 +128,97 @@ class StoryPage(Screen):
 
         self.add_widget(root)
 
+    @staticmethod
+    def _show_texture(img, texture):
+        img.texture = texture
+        img.opacity = 1
+
     def on_pre_enter(self):
         sm = self.manager
         if not sm:
             return
-        names = [s.name for s in sm.screens]
-        i = names.index(self.name)
-        self.page_label.text = f"Page {i+1} of {len(names)}"
+        i = sm.page_index[self.name]
+        self.page_label.text = f"Page {i+1} of {sm.page_count}"
         self.prev_btn.disabled = (i == 0)
-        self.next_btn.disabled = (i == len(names) - 1)
+        self.next_btn.disabled = (i == sm.page_count - 1)
 
     def _on_next_pressed(self, *args):
-        sm = self.manager
-        if sm:
-            names = [s.name for s in sm.screens]
-            i = names.index(sm.current)
-            if i + 1 < len(names):
-                sm.transition.direction = 'left'
-                sm.current = names[i + 1]
+        if self.manager:
+            self.manager.go_next()
 
     def _on_prev_pressed(self, *args):
-        sm = self.manager
-        if sm:
-            names = [s.name for s in sm.screens]
-            i = names.index(sm.current)
-            if i - 1 >= 0:
-                sm.transition.direction = 'right'
-                sm.current = names[i - 1]
+        if self.manager:
+            self.manager.go_previous()
 
     def on_touch_down(self, touch):
         w = Window.width
         x = touch.pos[0]
         sm = self.manager
         if sm:
-            names = [s.name for s in sm.screens]
-            i = names.index(sm.current)
-            if x > w * 0.6 and i + 1 < len(names):
-                sm.transition.direction = 'left'
-                sm.current = names[i + 1]
+            if x > w * 0.6 and sm.go_next():
                 return True
-            elif x < w * 0.4 and i - 1 >= 0:
-                sm.transition.direction = 'right'
-                sm.current = names[i - 1]
+            elif x < w * 0.4 and sm.go_previous():
                 return True
         return super().on_touch_down(touch)
 
 class MyScreenManager(ScreenManager):
+    """Holds the whole story but only builds the pages near the current one."""
+
+    def __init__(self, sequence=(), **kwargs):
+        super().__init__(**kwargs)
+        self.sequence = list(sequence)
+        self.page_names = [f"page{idx+1}" for idx in range(len(self.sequence))]
+        self.page_index = {name: idx for idx, name in enumerate(self.page_names)}
+        self.page_count = len(self.page_names)
+        self.position = 0  # index of the current page, kept in step with self.current
+        self.transition.bind(on_complete=lambda *args: self.drop_far_pages())
+
+    def build_page(self, idx):
+        name = self.page_names[idx]
+        if not self.has_screen(name):
+            item = self.sequence[idx]
+            self.add_widget(StoryPage(name=name, image_source=item.get("image",""), story_text=item.get("text","")))
+
+    def on_current(self, instance, value):
+        i = self.page_index.get(value)
+        if i is None:
+            super().on_current(instance, value)
+            return
+        self.position = i
+        self.build_page(i)  # the page must exist before switching to it
+        super().on_current(instance, value)
+        for j in range(max(0, i - PRELOAD_PAGES), min(self.page_count, i + PRELOAD_PAGES + 1)):
+            self.build_page(j)
+
+    def drop_far_pages(self):
+        for screen in self.screens[:]:
+            i = self.page_index.get(screen.name)
+            if i is not None and abs(i - self.position) > KEEP_PAGES:
+                self.remove_widget(screen)
+
+    # --- Navigation: every button, tap and key goes through go_to ---
+    def go_to(self, idx):
+        """Shows page idx (0-based), sliding in the reading direction.
+        Returns False if there is no such page or it is already shown."""
+        if not 0 <= idx < self.page_count or idx == self.position:
+            return False
+        self.transition.direction = 'left' if idx > self.position else 'right'
+        self.current = self.page_names[idx]
+        return True
+
+    def go_next(self):
+        return self.go_to(self.position + 1)
+
+    def go_previous(self):
+        return self.go_to(self.position - 1)
+
     def next(self):
-        names = [s.name for s in self.screens]
-        i = names.index(self.current)
-        if i + 1 < len(names):
-            return names[i + 1]
-        return names[i]
+        return self.page_names[min(self.position + 1, self.page_count - 1)]
     def previous(self):
-        names = [s.name for s in self.screens]
-        i = names.index(self.current)
-        if i - 1 >= 0:
-            return names[i - 1]
-        return names[i]
+        return self.page_names[max(self.position - 1, 0)]
 
 class StoryApp(App):
     def build(self):
-        sm = MyScreenManager(transition=SlideTransition())
         sequence = [
             {"image": "1.jpeg", "text": ""},
             {"image": "", "text": "Ella was a forest dwarf elf, daughter of Queen Zoiryt. She needed to find her way home after getting lost in the dense, whispering woods. Yet, the castle of the kingdom was still nearby, a beacon through the trees."},
@@ -152,24 +228,21 @@ class StoryApp(App):
             {"image": "", "text": "Along their journey, they faced great challenges, like the towering beast of the northern cliffs. Its roar shook the trees, and its eyes glowed like molten gold. Together, the group had to find courage and cleverness to pass safely. Every step brought Ella closer to home, but also deeper into the mysteries of the kingdom. Whispers of old magic and hidden secrets lingered in the wind. The castle’s walls promised safety, yet hinted at adventures still untold.[i]The End.[/i]"}
         ]
         
-        for idx, item in enumerate(sequence):
-            name = f"page{idx+1}"
-            s = StoryPage(name=name, image_source=item.get("image",""), story_text=item.get("text",""))
-            sm.add_widget(s)
-
-        if sm.screens:
-            sm.current = sm.screens[0].name
+        # Pages are built when the reader gets close to them
+        sm = MyScreenManager(sequence, transition=SlideTransition())
+        if sm.page_names:
+            sm.current = sm.page_names[0]
 
         # Keyboard navigation
         def on_key(window, key, scancode, codepoint, modifiers):
-            names = [s.name for s in sm.screens]
-            i = names.index(sm.current)
-            if key in (275, ord('d')) and i + 1 < len(names):
-                sm.transition.direction = 'left'
-                sm.current = names[i + 1]
-            if key in (276, ord('a')) and i - 1 >= 0:
-                sm.transition.direction = 'right'
-                sm.current = names[i - 1]
+            if key in (275, ord('d')):
+                sm.go_next()
+            elif key in (276, ord('a')):
+                sm.go_previous()
+            elif key == 278:  # Home
+                sm.go_to(0)
+            elif key == 279:  # End
+                sm.go_to(sm.page_count - 1)
 
         Window.bind(on_key_down=on_key)
         return sm
@@ -1,4 +1,72 @@
-expenses = []
+import csv
+import sqlite3
+from datetime import date
+from decimal import Decimal, DecimalException
+
+LEDGER_FILE = "expenses.db"
+BATCH_SIZE = 5000  # rows per executemany call when importing
+MIN_CENTS, MAX_CENTS = -2**63, 2**63 - 1  # SQLite INTEGER range
+
+# Amounts are stored as whole cents, so 0.1 + 0.2 is exactly 0.30.
+# The totals table holds count and sum per (category, month) and is updated
+# by a trigger on every insert, so totals never re-read the expenses.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cents INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    category TEXT NOT NULL,
+    month TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    cents INTEGER NOT NULL,
+    PRIMARY KEY (category, month)
+);
+CREATE TRIGGER IF NOT EXISTS expenses_totals AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO totals (category, month, count, cents)
+    VALUES (NEW.category, substr(NEW.day, 1, 7), 1, NEW.cents)
+    ON CONFLICT (category, month) DO UPDATE SET count = count + 1, cents = cents + excluded.cents;
+END;
+"""
+
+_conn = None
+
+
+def ledger():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(LEDGER_FILE)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(SCHEMA)
+    return _conn
+
+
+def parse_amount(text):
+    """'12.5' -> 1250 cents. More than two decimals is an error, not a rounding,
+    and so is anything SQLite cannot store as a 64-bit integer."""
+    try:
+        cents = Decimal(text.strip()) * 100
+        if not cents.is_finite() or cents != cents.to_integral_value():
+            raise ValueError(f"invalid amount: {text!r}")
+    except DecimalException:
+        raise ValueError(f"invalid amount: {text!r}")
+    if not MIN_CENTS <= cents <= MAX_CENTS:
+        raise ValueError(f"amount out of range: {text!r}")
+    return int(cents)
+
+
+def parse_day(text):
+    text = text.strip()
+    return date.fromisoformat(text).isoformat() if text else date.today().isoformat()
+
+
+def format_amount(cents):
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100:,}.{abs(cents) % 100:02d}"
 
 
 def menu():
@@ -6,47 +74,108 @@ def menu():
     print("1. Add expense")
     print("2. View expenses")
     print("3. Show total")
-    print("4. Exit")
+    print("4. Import expenses from CSV")
+    print("5. Exit")
 
 def add_expense():
     amount = input("Enter amount: ")
+    day = input("Date (YYYY-MM-DD, empty for today): ")
+    category = input("Category (empty for 'general'): ").strip() or "general"
     try:
-        amount=int(amount)
-        expenses.append(amount)
-        print("Expense added successfully")
+        cents = parse_amount(amount)
+        day = parse_day(day)
     except ValueError:
-        print("invalid amount")
+        print("invalid amount or date")
+        return
+    conn = ledger()
+    with conn:
+        conn.execute("INSERT INTO expenses (cents, day, category) VALUES (?, ?, ?)", (cents, day, category))
+    print("Expense added successfully")
 
 def view_expenses():
-    if not expenses:
+    rows = ledger().execute("SELECT day, category, cents FROM expenses ORDER BY day, id")
+    found = False
+    for day, category, cents in rows:
+        found = True
+        print(f"{day} | {category} | {format_amount(cents)}")
+    if not found:
         print("no expenses found")
-        return
-    for expense in expenses:
-        print(expense)
 
 def show_total():
-    total=sum(expenses)
-    print(f"Total expenses: {total}")
+    conn = ledger()
+    count, total = conn.execute("SELECT COALESCE(SUM(count), 0), COALESCE(SUM(cents), 0) FROM totals").fetchone()
+    print(f"Total expenses: {format_amount(total)} ({count} expense(s))")
+    if not count:
+        return
+    print("\nBy category:")
+    for category, cents in conn.execute("SELECT category, SUM(cents) FROM totals GROUP BY category ORDER BY category"):
+        print(f"  {category}: {format_amount(cents)}")
+    print("\nBy month:")
+    for month, cents in conn.execute("SELECT month, SUM(cents) FROM totals GROUP BY month ORDER BY month"):
+        print(f"  {month}: {format_amount(cents)}")
 
+def import_expenses(path):
+    """Adds every row of a CSV with an amount column and optional date and
+    category columns. Nothing is added if any row is invalid."""
+    def rows():
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                line = reader.line_num  # where the row ends, even if a quoted field spans lines
+                try:
+                    yield (parse_amount(row.get("amount") or ""), parse_day(row.get("date") or ""),
+                           (row.get("category") or "").strip() or "general")
+                except ValueError as e:
+                    raise ValueError(f"line {line}: {e}")
 
+    conn = ledger()
+    added = 0
+    batch = []
+    with conn:
+        for row in rows():
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                conn.executemany("INSERT INTO expenses (cents, day, category) VALUES (?, ?, ?)", batch)
+                added += len(batch)
+                batch = []
+        conn.executemany("INSERT INTO expenses (cents, day, category) VALUES (?, ?, ?)", batch)
+        added += len(batch)
+    return added
 
+def import_csv():
+    path = input("CSV file (columns: amount, date, category): ").strip()
+    try:
+        added = import_expenses(path)
+    except OSError as e:
+        print(f"could not read the file: {e}")
+    except ValueError as e:
+        print(f"import failed, nothing was added: {e}")
+    else:
+        print(f"{added} expense(s) imported")
 
-while True:
-    menu()
-    option = input("Choose an option: ")
 
-    if option == "1":
-        add_expense()
 
-    elif option == "2":
-        view_expenses()
 
-    elif option == "3":
-        show_total()
+if __name__ == "__main__":
+    while True:
+        menu()
+        option = input("Choose an option: ")
 
-    elif option == "4":
-        print("Goodbye!")
-        break
+        if option == "1":
+            add_expense()
 
-    else:
-        print("Invalid option")
+        elif option == "2":
+            view_expenses()
+
+        elif option == "3":
+            show_total()
+
+        elif option == "4":
+            import_csv()
+
+        elif option == "5":
+            print("Goodbye!")
+            break
+
+        else:
+            print("Invalid option")
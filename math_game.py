@@ -1,97 +1,366 @@
-# Math-game #To run this code properly, a text file named winner.txt must exist in the same folder as your script.Without it, the program may fail or throw a FileNotFoundError. 📝
+# Math-game # Every result is kept in leaderboard.db, created automatically in the same folder as your script. 📝
 # 🔥 You have 30 seconds to answer as many math problems as possible! 🧮💥
 import random
 import time
 import os
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
-WINNER_FILE = "winner.txt"
+LEADERBOARD_DB = "leaderboard.db"
+WINNER_FILE = "winner.txt"  # Old single high score, imported into the leaderboard once
 
-def generate_operation():
+TIME_LIMIT = 30  # seconds
+
+# Difficulty levels: operand range and operations. "/" always divides evenly
+# and "%" is the remainder, so every answer is a whole number.
+LEVELS = {
+    1: {"name": "Easy", "range": (1, 10), "ops": "+-*"},
+    2: {"name": "Medium", "range": (1, 20), "ops": "+-*/"},
+    3: {"name": "Hard", "range": (2, 50), "ops": "+-*/"},
+    4: {"name": "Expert", "range": (10, 99), "ops": "+-*/%"},
+}
+
+# ===========================
+# GAME ENGINE
+# ===========================
+# No input() or print() here: the interactive game, the simulations and the
+# benchmark all drive the same code.
+def generate_batch(n, rng=random, level=1):
+    """Generates n math operations as (text, result) pairs from rng (a seeded random.Random for repeatable games)."""
+    low, high = LEVELS[level]["range"]
+    ops = LEVELS[level]["ops"]
+    randint, choice = rng.randint, rng.choice
+    batch = []
+    for _ in range(n):
+        num1 = randint(low, high)
+        num2 = randint(low, high)
+        operation = choice(ops)
+
+        if operation == "+":
+            result = num1 + num2
+        elif operation == "-":
+            result = num1 - num2
+        elif operation == "*":
+            result = num1 * num2
+        elif operation == "/":
+            result = num1
+            num1 = num1 * num2
+        else:
+            result = num1 % num2
+
+        batch.append((f"{num1} {operation} {num2}", result))
+    return batch
+
+def generate_operation(rng=random, level=1):
     """Generates a random math operation."""
-    num1 = random.randint(1, 10)
-    num2 = random.randint(1, 10)
-    operation = random.choice(["+", "-", "*"])
-
-    if operation == "+":
-        result = num1 + num2
-    elif operation == "-":
-        result = num1 - num2
-    else:
-        result = num1 * num2
+    return generate_batch(1, rng, level)[0]
 
-    return f"{num1} {operation} {num2}", result
+class GameSession:
+    """The state of one game: the current problem, score, rounds and time used.
 
-def read_winner():
-    """Reads the highest score safely."""
-    if not os.path.exists(WINNER_FILE):
-        return ("Nobody", 0)
+    Time only moves when an answer says how long it took, so a session can be
+    played live or replayed from recorded or simulated answers.
+    """
+
+    def __init__(self, seed=None, level=1, time_limit=TIME_LIMIT, batch_size=64):
+        if level not in LEVELS:
+            raise ValueError(f"unknown level: {level}")
+        self.rng = random.Random(seed)
+        self.level = level
+        self.time_limit = time_limit
+        self.batch_size = batch_size
+        self.score = 0
+        self.rounds = 0
+        self.elapsed = 0.0
+        self._pending = []
+        self.problem = None
+        self.next_problem()
+
+    def next_problem(self):
+        if not self._pending:
+            self._pending = generate_batch(self.batch_size, self.rng, self.level)
+            self._pending.reverse()
+        self.problem = self._pending.pop()
+        self.rounds += 1
+        return self.problem
+
+    @property
+    def time_left(self):
+        return self.time_limit - self.elapsed
+
+    @property
+    def finished(self):
+        return self.elapsed >= self.time_limit
+
+    def answer(self, text, seconds=0.0):
+        """Scores an answer to the current problem and moves on to the next one.
+
+        Returns True or False, or None if text is not a number.
+        """
+        self.elapsed += seconds
+        text = text.strip()
+        if not text.lstrip("-").isdigit():
+            correct = None
+        else:
+            correct = int(text) == self.problem[1]
+            self.score += correct
+        if not self.finished:
+            self.next_problem()
+        return correct
+
+def score_session(session, answers):
+    """Feeds (text, seconds) answers to session until its time is up; returns (score, rounds)."""
+    for text, seconds in answers:
+        if session.finished:
+            break
+        session.answer(text, seconds)
+    return session.score, session.rounds
+
+def simulated_answers(session, rng, accuracy=0.8, speed=(1.0, 4.0)):
+    """A made-up player: right with probability accuracy, taking speed[0]-speed[1] seconds per answer."""
+    while True:
+        result = session.problem[1]
+        if rng.random() >= accuracy:
+            result += rng.choice((-1, 1))
+        yield str(result), rng.uniform(*speed)
+
+def replay_session(spec):
+    """Plays the simulated session (seed, level, accuracy) and returns (score, rounds)."""
+    seed, level, accuracy = spec
+    session = GameSession(seed, level)
+    return score_session(session, simulated_answers(session, random.Random(f"player-{seed}"), accuracy))
+
+def replay_sessions(specs, workers=None, chunksize=256):
+    """Replays many simulated sessions on a process pool, results in the same order."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(replay_session, specs, chunksize=chunksize))
+
+def benchmark(problems=500_000, sessions=20_000, level=2, workers=None):
+    """Measures problem generation and session scoring, serially and on a process pool."""
+    print(f"📊 Benchmark - level {level} ({LEVELS[level]['name']})")
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    generate_batch(problems, rng, level)
+    elapsed = time.perf_counter() - start
+    print(f"Problems generated: {problems:,} in {elapsed:.2f}s ({problems / elapsed:,.0f}/s)")
+
+    specs = [(seed, level, 0.8) for seed in range(sessions)]
+    serial = max(1, sessions // 10)
+    start = time.perf_counter()
+    for spec in specs[:serial]:
+        replay_session(spec)
+    elapsed = time.perf_counter() - start
+    print(f"Sessions scored, 1 process: {serial:,} in {elapsed:.2f}s ({serial / elapsed:,.0f}/s)")
+
+    start = time.perf_counter()
+    results = replay_sessions(specs, workers)
+    elapsed = time.perf_counter() - start
+    print(f"Sessions scored, {workers or os.cpu_count()} processes: {sessions:,} in {elapsed:.2f}s "
+          f"({sessions / elapsed:,.0f}/s)")
+    print(f"Average score: {sum(score for score, _ in results) / len(results):.1f} "
+          f"in {sum(rounds for _, rounds in results) / len(results):.1f} rounds")
+
+# ===========================
+# LEADERBOARD
+# ===========================
+# results keeps every game. players keeps each player's best score, and
+# best_counts how many players have each best score, so a rank is a sum over
+# the few distinct scores above it instead of a count over all players.
+# Writes run in one IMMEDIATE transaction, so games finishing at the same
+# time queue up instead of overwriting each other.
+def connect():
+    conn = sqlite3.connect(LEADERBOARD_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            rounds INTEGER,
+            duration REAL,
+            played_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_score ON results(score DESC, id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS players (
+            name TEXT PRIMARY KEY,
+            best INTEGER NOT NULL,
+            best_at TEXT NOT NULL,
+            games INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_players_best ON players(best DESC, best_at)")
+    conn.execute("CREATE TABLE IF NOT EXISTS best_counts (score INTEGER PRIMARY KEY, players INTEGER NOT NULL)")
+    return conn
+
+@contextmanager
+def leaderboard(write=False):
+    conn = connect()
+    try:
+        if write:
+            conn.execute("BEGIN IMMEDIATE")  # take the write lock before reading the current best
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        else:
+            yield conn
+    finally:
+        conn.close()
+
+def _add_result(conn, name, score, rounds, duration, played_at):
+    conn.execute("INSERT INTO results (player, score, rounds, duration, played_at) VALUES (?, ?, ?, ?, ?)",
+                 (name, score, rounds, duration, played_at))
+    row = conn.execute("SELECT best FROM players WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        conn.execute("INSERT INTO players (name, best, best_at, games) VALUES (?, ?, ?, 1)", (name, score, played_at))
+    elif score > row[0]:
+        conn.execute("UPDATE players SET best = ?, best_at = ?, games = games + 1 WHERE name = ?",
+                     (score, played_at, name))
+        conn.execute("UPDATE best_counts SET players = players - 1 WHERE score = ?", (row[0],))
+        conn.execute("DELETE FROM best_counts WHERE score = ? AND players = 0", (row[0],))
+    else:
+        conn.execute("UPDATE players SET games = games + 1 WHERE name = ?", (name,))
+        return
+    conn.execute("""
+        INSERT INTO best_counts (score, players) VALUES (?, 1)
+        ON CONFLICT(score) DO UPDATE SET players = players + 1
+    """, (score,))
+
+def import_old_winner(conn):
+    """Moves the high score from winner.txt into an empty leaderboard."""
+    if not os.path.exists(WINNER_FILE) or conn.execute("SELECT 1 FROM results LIMIT 1").fetchone():
+        return
     with open(WINNER_FILE, "r") as f:
         content = f.read().strip()
-        if not content:
-            return ("Nobody", 0)
-        try:
-            name, score = content.split(",")
-            return name.strip(), int(score.strip())
-        except ValueError:
-            return ("Nobody", 0)
-
-def save_winner(name, score):
-    """Saves a new high score."""
-    with open(WINNER_FILE, "w") as f:
-        f.write(f"{name},{score}")
-
-def play_game():
+    try:
+        name, score = content.rsplit(",", 1)
+        score = int(score.strip())
+    except ValueError:
+        return
+    _add_result(conn, name.strip(), score, None, None, time.strftime("%Y-%m-%d %H:%M:%S"))
+
+def record_result(name, score, rounds=None, duration=None):
+    """Adds a finished game to the leaderboard, updating the player's best."""
+    with leaderboard(write=True) as conn:
+        import_old_winner(conn)
+        _add_result(conn, name, score, rounds, duration, time.strftime("%Y-%m-%d %H:%M:%S"))
+
+def read_winner():
+    """Returns the highest score ever and who made it."""
+    query = "SELECT player, score FROM results ORDER BY score DESC, id LIMIT 1"
+    with leaderboard() as conn:
+        row = conn.execute(query).fetchone()
+    if row is None and os.path.exists(WINNER_FILE):
+        # only an empty leaderboard with an old winner.txt needs the write lock
+        with leaderboard(write=True) as conn:
+            import_old_winner(conn)
+            row = conn.execute(query).fetchone()
+    return row or ("Nobody", 0)
+
+def top_scores(n=10):
+    """The n best games as (player, score, played_at), earliest first on ties."""
+    with leaderboard() as conn:
+        return conn.execute("SELECT player, score, played_at FROM results ORDER BY score DESC, id LIMIT ?",
+                            (n,)).fetchall()
+
+def top_players(n=10):
+    """The n best players as (name, best, games)."""
+    with leaderboard() as conn:
+        return conn.execute("SELECT name, best, games FROM players ORDER BY best DESC, best_at LIMIT ?",
+                            (n,)).fetchall()
+
+def player_best(name):
+    """The player's best score, or None if they never played."""
+    with leaderboard() as conn:
+        row = conn.execute("SELECT best FROM players WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+def player_rank(name):
+    """Returns (rank, number of players) by best score; players tied share a rank."""
+    with leaderboard() as conn:
+        row = conn.execute("SELECT best FROM players WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        above = conn.execute("SELECT COALESCE(SUM(players), 0) FROM best_counts WHERE score > ?", (row[0],)).fetchone()[0]
+        total = conn.execute("SELECT COALESCE(SUM(players), 0) FROM best_counts").fetchone()[0]
+    return above + 1, total
+
+def play_game(level=1):
     print("🎯 Welcome to the Math Game with Time and High Score!")
-    print("You have 30 seconds to answer as many math problems as possible.")
+    print(f"You have {TIME_LIMIT} seconds to answer as many math problems as possible.")
+    print(f"Level: {LEVELS[level]['name']}")
     print("Type 'exit' to quit anytime.\n")
 
-    score = 0
-    rounds = 0
-    TIME_LIMIT = 30  # seconds
-    start_time = time.time()
-
     player_name = input("Enter your name: ")
 
     # Read current high score
     current_winner, high_score = read_winner()
     print(f"🏆 Current high score: {high_score} by {current_winner}\n")
 
+    session = GameSession(level=level)
+    start_time = last = time.time()
     while True:
-        time_left = TIME_LIMIT - (time.time() - start_time)
-        if time_left <= 0:
+        if session.finished:
             print("\n⏰ Time's up!")
             break
 
-        operation, result = generate_operation()
-        rounds += 1
+        operation, result = session.problem
 
-        print(f"Time remaining: {time_left:.1f} seconds")
-        answer = input(f"Round {rounds} → What is {operation}? ")
+        print(f"Time remaining: {session.time_left:.1f} seconds")
+        answer = input(f"Round {session.rounds} → What is {operation}? ")
+        now = time.time()
 
         if answer.lower() == "exit":
             break
 
-        if not answer.strip().lstrip("-").isdigit():
+        correct = session.answer(answer, now - last)
+        last = now
+        if correct is None:
             print("⚠️ Please enter a valid number.\n")
-            continue
-
-        if int(answer) == result:
-            score += 1
+        elif correct:
             print("✅ Correct!\n")
         else:
             print(f"❌ Incorrect. The correct answer was {result}.\n")
 
+    score, rounds = session.score, session.rounds
     print("\n🎮 Game over.")
     print(f"Rounds played: {rounds}")
     print(f"Final score: {score}")
     print(f"Total time played: {time.time() - start_time:.1f} seconds")
 
+    previous_best = player_best(player_name)
+    record_result(player_name, score, rounds, round(time.time() - start_time, 1))
+
     # Check for new high score
     if score > high_score:
         print(f"🎉 Congratulations {player_name}! New world record: {score} points")
-        save_winner(player_name, score)
     else:
         print(f"The high score remains {high_score} by {current_winner}")
+    if previous_best is not None and score > previous_best:
+        print(f"⭐ New personal best (was {previous_best})")
+    rank, players = player_rank(player_name)
+    print(f"Your rank: {rank} of {players} player(s)")
+
+    print("\n🏆 Top 5")
+    for position, (name, best, games) in enumerate(top_players(5), 1):
+        print(f"{position}. {name} - {best} points ({games} game(s))")
 
 if __name__ == "__main__":
-    play_game()
+    parser = argparse.ArgumentParser(description="Math game")
+    parser.add_argument("--level", type=int, choices=sorted(LEVELS), default=1, help="difficulty level")
+    parser.add_argument("--benchmark", action="store_true", help="measure the game engine instead of playing")
+    parser.add_argument("--problems", type=int, default=500_000, help="problems to generate in the benchmark")
+    parser.add_argument("--sessions", type=int, default=20_000, help="simulated sessions to score in the benchmark")
+    parser.add_argument("--workers", type=int, help="benchmark processes (default: one per CPU)")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.problems, args.sessions, args.level, args.workers)
+    else:
+        play_game(args.level)
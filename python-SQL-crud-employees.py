@@ -1,89 +1,337 @@
 import sqlite3
 import os
+import csv
+import json
+import time
+import functools
+import itertools
+import threading
+from contextlib import contextmanager
+
+DB_FILE = "company.db"
+BATCH_SIZE = 1000  # rows per executemany call in the bulk functions
+PAGE_SIZE = 20     # rows shown per page by list_employees
 
 # The database file (company.db) will be created in the same folder as this Python script
-print("Full path of the database:", os.path.abspath("company.db"))
+print("Full path of the database:", os.path.abspath(DB_FILE))
 
 # ===========================
-# DATABASE CONNECTION & TABLE CREATION
+# SQL STATEMENTS
 # ===========================
-def connect():
-    return sqlite3.connect("company.db")  # DB will be created in the current folder
+# Every statement the module runs is defined here once. Using the exact same
+# text each time lets sqlite3's per-connection statement cache reuse the
+# prepared statement instead of compiling it again. {where} is filled from a
+# fixed set of filter clauses, so it only ever produces a handful of variants.
+SQL = {
+    "insert_employee": "INSERT INTO employees (name, position, salary) VALUES (?, ?, ?)",
+    "update_salary": "UPDATE employees SET salary=? WHERE id=?",
+    "delete_employee": "DELETE FROM employees WHERE id=?",
+    "count_employees": "SELECT COUNT(*) FROM employees",
+    "select_employees": "SELECT * FROM employees WHERE {where} ORDER BY id",
+    "select_employees_page": "SELECT * FROM employees WHERE {where} ORDER BY id LIMIT ?",
+    "data_version": "PRAGMA data_version",
+    "payroll_by_position": """
+        SELECT position, COUNT(*), SUM(salary), AVG(salary), MIN(salary), MAX(salary)
+        FROM employees
+        GROUP BY position
+        ORDER BY position
+    """,
+    "salary_bands": """
+        SELECT band, COUNT(*), MIN(salary), MAX(salary), AVG(salary)
+        FROM (SELECT salary, NTILE(?) OVER (ORDER BY salary) AS band
+              FROM employees WHERE salary IS NOT NULL)
+        GROUP BY band
+        ORDER BY band
+    """,
+    "top_earners": """
+        SELECT RANK() OVER (ORDER BY salary DESC), id, name, position, salary
+        FROM (SELECT * FROM employees WHERE salary IS NOT NULL ORDER BY salary DESC LIMIT ?)
+    """,
+}
 
-def create_table():
-    conn = connect()
-    cursor = conn.cursor()
-    cursor.execute("""
+# Schema changes are appended here, never edited in place. The database's
+# PRAGMA user_version records how many have been applied.
+MIGRATIONS = [
+    # 1: employees table
+    ["""
         CREATE TABLE IF NOT EXISTS employees (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             position TEXT NOT NULL,
             salary REAL
         )
-    """)
-    conn.commit()
-    # Insert a sample employee if table is empty
-    cursor.execute("SELECT COUNT(*) FROM employees")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO employees (name, position, salary) VALUES (?, ?, ?)",
-                       ("Laura Perez", "Analyst", 4200.50))
+    """],
+    # 2: indexes for the position/salary filters
+    ["CREATE INDEX IF NOT EXISTS idx_employees_position ON employees(position)",
+     "CREATE INDEX IF NOT EXISTS idx_employees_salary ON employees(salary)"],
+]
+
+# ===========================
+# DATABASE CONNECTION & TABLE CREATION
+# ===========================
+# Each thread keeps one long-lived connection instead of opening and closing
+# one per call. WAL lets readers run while a write is in progress, and with
+# WAL synchronous=NORMAL only fsyncs at checkpoints, not on every commit.
+_local = threading.local()
+
+def connect():
+    """Returns this thread's connection, opening and tuning it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE)  # DB will be created in the current folder
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn = conn
+        _local.depth = 0
+        _local.reports = {}  # report cache, only valid for this connection's data_version
+    return conn
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """Groups statements into one commit: with transaction() as conn: ...
+
+    Nested blocks join the outermost one, which commits on success and rolls
+    back if an exception escapes it.
+    """
+    conn = connect()
+    if _local.depth == 0 and not conn.in_transaction:
+        conn.execute("BEGIN")  # sqlite3 does not open one by itself before DDL
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.rollback()
+        raise
+    _local.depth -= 1
+    if _local.depth == 0:
         conn.commit()
-    conn.close()
+        _local.reports.clear()  # every write goes through here
+
+def migrate():
+    """Brings the schema up to date. Once current, this is a single header read."""
+    conn = connect()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return
+    for number, statements in enumerate(MIGRATIONS[version:], version + 1):
+        with transaction():
+            for statement in statements:
+                conn.execute(statement)
+            if number == 1 and conn.execute(SQL["count_employees"]).fetchone()[0] == 0:
+                # Insert a sample employee into a brand new table
+                conn.execute(SQL["insert_employee"], ("Laura Perez", "Analyst", 4200.50))
+            conn.execute(f"PRAGMA user_version = {number}")
 
 # ===========================
 # CRUD FUNCTIONS
 # ===========================
 def add_employee(name, position, salary):
-    conn = connect()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO employees (name, position, salary) VALUES (?, ?, ?)",
-                   (name, position, salary))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(SQL["insert_employee"], (name, position, salary))
     print("✅ Employee added")
 
-def list_employees():
-    conn = connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM employees")
-    employees = cursor.fetchall()
-    conn.close()
-
-    if employees:
-        print("\n📋 Employees:")
-        for emp in employees:
+# Listing uses keyset pagination: each page asks for rows with id > the last
+# id already seen, so every page is an index seek no matter how deep it is.
+def _where(position=None, min_salary=None, max_salary=None, after_id=0):
+    clauses, params = ["id > ?"], [after_id]
+    if position is not None:
+        clauses.append("position = ?")
+        params.append(position)
+    if min_salary is not None:
+        clauses.append("salary >= ?")
+        params.append(min_salary)
+    if max_salary is not None:
+        clauses.append("salary <= ?")
+        params.append(max_salary)
+    return " AND ".join(clauses), params
+
+def employees_page(after_id=0, limit=PAGE_SIZE, position=None, min_salary=None, max_salary=None):
+    """One page of matching rows ordered by id. Pass the last id back as after_id for the next page."""
+    where, params = _where(position, min_salary, max_salary, after_id)
+    return connect().execute(SQL["select_employees_page"].format(where=where), params + [limit]).fetchall()
+
+def iter_employees(position=None, min_salary=None, max_salary=None, batch_size=BATCH_SIZE):
+    """Yields every matching row in id order, holding only batch_size rows in memory."""
+    where, params = _where(position, min_salary, max_salary)
+    cursor = connect().execute(SQL["select_employees"].format(where=where), params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def list_employees(position=None, min_salary=None, max_salary=None):
+    last_id = 0
+    shown = 0
+    while True:
+        # one extra row tells whether there is a next page
+        rows = employees_page(last_id, PAGE_SIZE + 1, position, min_salary, max_salary)
+        if not rows and not shown:
+            print("No employees found")
+            return
+        if not shown:
+            print("\n📋 Employees:")
+        for emp in rows[:PAGE_SIZE]:
             print(f"ID:{emp[0]} Name:{emp[1]} Position:{emp[2]} Salary:{emp[3]}")
-    else:
-        print("No employees found")
+        shown += len(rows[:PAGE_SIZE])
+        if len(rows) <= PAGE_SIZE:
+            return
+        last_id = rows[PAGE_SIZE - 1][0]
+        if input("-- Enter for more, q to stop -- ").strip().lower() == "q":
+            return
 
 def update_salary(employee_id, new_salary):
-    conn = connect()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE employees SET salary=? WHERE id=?", (new_salary, employee_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(SQL["update_salary"], (new_salary, employee_id))
     print("✅ Salary updated")
 
 def delete_employee(employee_id):
-    conn = connect()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM employees WHERE id=?", (employee_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(SQL["delete_employee"], (employee_id,))
     print("✅ Employee deleted")
 
+# ===========================
+# BULK FUNCTIONS
+# ===========================
+# Each bulk call runs as one transaction, feeding executemany in chunks so
+# iterables of any size are streamed instead of loaded whole.
+def _chunks(rows, size):
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _run_batch(sql, rows, chunk_size, done):
+    start = time.perf_counter()
+    count = 0
+    with transaction() as conn:
+        for chunk in _chunks(rows, chunk_size):
+            count += conn.executemany(sql, chunk).rowcount
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0
+    print(f"✅ {count} employee(s) {done} ({rate:,.0f} rows/s)")
+    return count
+
+def add_employees(rows, chunk_size=BATCH_SIZE):
+    """Inserts (name, position, salary) rows in one transaction."""
+    return _run_batch(SQL["insert_employee"], rows, chunk_size, "added")
+
+def update_salaries(salaries, chunk_size=BATCH_SIZE):
+    """Updates salaries from (employee_id, new_salary) pairs or an {id: salary} dict."""
+    if isinstance(salaries, dict):
+        salaries = salaries.items()
+    return _run_batch(SQL["update_salary"],
+                      ((salary, emp_id) for emp_id, salary in salaries), chunk_size, "updated")
+
+def delete_employees(employee_ids, chunk_size=BATCH_SIZE):
+    return _run_batch(SQL["delete_employee"],
+                      ((emp_id,) for emp_id in employee_ids), chunk_size, "deleted")
+
+def _salary(value):
+    return None if value in (None, "") else float(value)
+
+def _employee_row(rec):
+    if not isinstance(rec, dict):
+        raise ValueError("expected an object with name, position and salary")
+    for field in ("name", "position"):
+        if not isinstance(rec.get(field), str) or not rec[field].strip():
+            raise ValueError(f"missing {field}")
+    return rec["name"], rec["position"], _salary(rec.get("salary"))
+
+def read_employees_file(path):
+    """Yields (name, position, salary) rows from a CSV with a name,position,salary header or a JSONL file.
+
+    A record without a name or position, or with a salary that is not a
+    number, raises ValueError with its line number.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".jsonl"):
+            records = ((n, line) for n, line in enumerate(f, 1) if line.strip())
+            parse = json.loads
+        else:
+            reader = csv.DictReader(f)
+            records = ((reader.line_num, rec) for rec in reader)
+            parse = dict
+        for line, rec in records:
+            try:
+                yield _employee_row(parse(rec))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"line {line}: {e}") from None
+
+# ===========================
+# REPORTS
+# ===========================
+# Reports are computed by SQLite (aggregates and window functions) and cached
+# per connection, since PRAGMA data_version is only comparable within one.
+# A connection's cache is cleared by its own committed transactions, and an
+# entry is also dropped when data_version shows another connection wrote.
+def cached_report(fn):
+    @functools.wraps(fn)
+    def wrapper(*args):
+        version = connect().execute(SQL["data_version"]).fetchone()[0]
+        key = (fn.__name__, args)
+        hit = _local.reports.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        result = fn(*args)
+        _local.reports[key] = (version, result)
+        return result
+    return wrapper
+
+@cached_report
+def payroll_by_position():
+    """(position, headcount, total, average, min, max) per position."""
+    return connect().execute(SQL["payroll_by_position"]).fetchall()
+
+@cached_report
+def salary_bands(bands=4):
+    """Splits salaries into equal-count percentile bands: (band, headcount, min, max, average)."""
+    return connect().execute(SQL["salary_bands"], (bands,)).fetchall()
+
+@cached_report
+def top_earners(n=10):
+    """(rank, id, name, position, salary) of the n best paid; ties share a rank."""
+    return connect().execute(SQL["top_earners"], (n,)).fetchall()
+
+def print_reports():
+    print("\n📊 Payroll by position:")
+    for position, count, total, avg, low, high in payroll_by_position():
+        print(f"{position}: {count} employee(s) Total:{total} Avg:{avg:.2f} Min:{low} Max:{high}"
+              if total is not None else f"{position}: {count} employee(s)")
+    print("\n📊 Salary quartiles:")
+    for band, count, low, high, avg in salary_bands(4):
+        print(f"Q{band}: {count} employee(s) from {low} to {high} (avg {avg:.2f})")
+    print("\n🏆 Top earners:")
+    for rank, emp_id, name, position, salary in top_earners(10):
+        print(f"#{rank} ID:{emp_id} Name:{name} Position:{position} Salary:{salary}")
+
 # ===========================
 # INTERACTIVE MENU
 # ===========================
 def menu():
-    create_table()  # Ensure the table exists and has at least one sample employee
+    migrate()  # Create or upgrade the schema; a no-op once it is current
     while True:
         print("\n=== MENU ===")
         print("1. Add employee")
         print("2. List employees")
         print("3. Update salary")
         print("4. Delete employee")
-        print("5. Exit")
+        print("5. Import employees from CSV/JSONL")
+        print("6. Filter employees")
+        print("7. Payroll reports")
+        print("8. Exit")
 
         option = input("Choose an option: ")
 
@@ -104,7 +352,21 @@ def menu():
             emp_id = int(input("Employee ID to delete: "))
             delete_employee(emp_id)
         elif option == "5":
+            path = input("CSV or JSONL file: ")
+            try:
+                add_employees(read_employees_file(path))
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f"❌ Import failed, no employees were added: {e}")
+        elif option == "6":
+            position = input("Position (leave empty for any): ").strip() or None
+            min_salary = input("Minimum salary (leave empty for none): ").strip()
+            max_salary = input("Maximum salary (leave empty for none): ").strip()
+            list_employees(position, _salary(min_salary), _salary(max_salary))
+        elif option == "7":
+            print_reports()
+        elif option == "8":
             print("👋 Exiting...")
+            close_connection()
             break
         else:
             print("❌ Invalid option")
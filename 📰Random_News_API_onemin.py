@@ -2,13 +2,25 @@ import requests
 import schedule
 import time
 import os
-import random  # To select a random news article
+import random  # Jitter for retry delays
+import json
+import queue
+import sqlite3
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 
 # 🔑 Your NewsAPI key
 API_KEY = "ENTER_HERE_YOUR_NEWS_API_KEY_TO_PROCEED"
 
 # Endpoint and parameters for top headlines
-URL = "https://newsapi.org/v2/top-headlines"
+# (set NEWS_API_URL to point the fetcher at a local stub server for testing)
+URL = os.environ.get("NEWS_API_URL", "https://newsapi.org/v2/top-headlines")
 PARAMS = {
     "country": "us",       # Change to "es", "mx", etc. if desired
     "apiKey": API_KEY,
@@ -16,54 +28,436 @@ PARAMS = {
     "sortBy": "publishedAt"  # Get latest news first
 }
 
+# Every country/category pair is polled on each run; None means all categories
+COUNTRIES = ["us"]         # e.g. ["us", "gb", "mx"]
+CATEGORIES = [None]        # e.g. ["business", "technology", "science"]
+
+# Extra sources: RSS/Atom feeds (URLs or local files) and local JSON files in
+# the NewsAPI response format (handy as test fixtures)
+FEEDS = []                 # e.g. ["https://feeds.bbci.co.uk/news/rss.xml", "feeds/local.atom"]
+JSON_FILES = []            # e.g. ["fixtures/headlines.json"]
+
+# Network settings
+MAX_CONCURRENCY = 8        # Requests in flight at the same time (also the connection pool size)
+TIMEOUT = (3.05, 10)       # Seconds to connect, seconds to wait for the response
+RETRIES = 3                # Extra attempts after a timeout, connection error, 429 or 5xx
+BACKOFF = 0.5              # First retry delay in seconds, doubled on every attempt
+
+# Caching: responses with an ETag/Last-Modified are revalidated on every run
+# (a 304 costs no payload); others are reused for CACHE_TTL seconds
+CACHE_TTL = 120
+
+# Polling adapts to how often new articles show up: it speeds up after a run
+# that found some and slows down after one that found none
+MIN_INTERVAL = 60          # Seconds
+MAX_INTERVAL = 15 * 60     # Seconds
+
+# Pipeline: sources -> normalize -> dedupe -> sinks, joined by bounded queues
+QUEUE_SIZE = 64            # Batches waiting between two stages before the earlier one blocks
+PARSE_WORKERS = 4          # Threads parsing fetched payloads into articles
+WRITE_WORKERS = 2          # Threads writing new articles to the sinks
+
 # Markdown file to save clickable news titles
 NEWS_FILE = "news.md"
 
-def save_news_md(title, url):
+# Every fetched article is kept here; it is also what dedupe checks against
+ARTICLES_DB = "news.db"
+
+# Optional JSON Lines export, one article per line (used when JsonlSink is in SINKS)
+JSONL_FILE = "news.jsonl"
+
+class RetryableError(Exception):
+    """A response worth asking for again (rate limited or server error)."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_session = None
+
+# Cached responses by URL and parameters, and counters for how they were served:
+# "hit" (fresh copy, no request), "revalidated" (304), "miss" (full download)
+_http_cache = {}
+CACHE_STATS = Counter()
+_stats_lock = threading.Lock()
+
+def count(stat):
+    with _stats_lock:
+        CACHE_STATS[stat] += 1
+
+def source_hosts():
+    """The distinct hosts the configured sources are fetched from."""
+    return {urlsplit(location).netloc for location in [URL, *FEEDS] if "://" in location}
+
+def get_session():
+    """One keep-alive session shared by every request, so connections are reused."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        # one pool per host, or hosts evict each other's pools and reconnect every
+        # time; at least 10 (the requests default) leaves room for redirects
+        adapter = HTTPAdapter(pool_connections=max(len(source_hosts()), 10), pool_maxsize=MAX_CONCURRENCY)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+_db = None
+_db_lock = threading.Lock()
+
+def get_db():
+    """Opens the article store, creating its table on first use.
+
+    url is UNIQUE, so checking whether an article was already saved is an
+    index lookup, not a scan of the history. The connection is shared by the
+    pipeline threads; hold _db_lock while using it.
     """
-    Save a news article in Markdown format with a clickable title.
-    Example in the file: [Title](URL)
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(ARTICLES_DB, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        with _db:
+            _db.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT,
+                    source TEXT,
+                    published_at TEXT,
+                    fetched_at TEXT NOT NULL,
+                    query TEXT
+                )
+            """)
+    return _db
+
+def md_entry(article):
+    """A news article in Markdown format with a clickable title: [Title](URL)"""
+    return f"[{article['title']}]({article['url']})\n"
+
+def rebuild_news_md():
+    """Writes the Markdown file again from every article in the store."""
+    db = get_db()
+    with _db_lock:
+        rows = db.execute("SELECT title, url FROM articles ORDER BY id").fetchall()
+    with open(NEWS_FILE, "w", encoding="utf-8") as f:
+        f.writelines(md_entry({"title": title, "url": url}) for title, url in rows)
+    return len(rows)
+
+# ===========================
+# HTTP
+# ===========================
+def cache_key(url, params):
+    return (url,) + tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
+
+def get_page(url, params=None):
+    """Blocking request for one page, run in a worker thread.
+
+    Returns the response body, or None when the cached copy is still current.
     """
-    md_entry = f"[{title}]({url})"
-    with open(NEWS_FILE, "a", encoding="utf-8") as f:
-        f.write(md_entry + "\n")
+    key = cache_key(url, params)
+    entry = _http_cache.get(key)
+    headers = {}
+    if entry:
+        if not entry["validators"] and time.time() - entry["time"] < CACHE_TTL:
+            count("hit")
+            return None
+        headers.update(entry["validators"])
+    response = get_session().get(url, params=params, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get("Retry-After", "")
+        raise RetryableError(f"HTTP {response.status_code}",
+                             float(retry_after) if retry_after.isdigit() else None)
+    if response.status_code == 304 and entry:
+        entry["time"] = time.time()
+        count("revalidated")
+        return None
+    count("miss")
+    if response.ok:
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        _http_cache[key] = {"validators": validators, "time": time.time()}
+    return response.content
 
-def fetch_news():
-    """Fetch top headlines and save one random article to the Markdown file"""
-    try:
-        response = requests.get(URL, params=PARAMS)
-        data = response.json()
-        
-        # Check if API request was successful
-        if data.get("status") != "ok":
-            print("Error fetching news:", data)
-            return
+# ===========================
+# SOURCES
+# ===========================
+# A source has a name, a blocking fetch() that returns a raw payload (None if
+# unchanged) and a parse(payload) that turns it into normalized articles:
+# dicts with url, title, source and published_at.
+def article(url, title, source, published_at):
+    return {"url": (url or "").strip(), "title": (title or "").strip() or "(untitled)",
+            "source": source, "published_at": published_at}
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def newsapi_articles(data):
+    if data.get("status") != "ok":
+        raise ValueError(f"error from the API: {data.get('message') or data}")
+    return [article(a.get("url"), a.get("title"), (a.get("source") or {}).get("name"), a.get("publishedAt"))
+            for a in data.get("articles", [])]
+
+class NewsAPISource:
+    """Top headlines for one country/category."""
+
+    def __init__(self, country, category=None):
+        self.params = dict(PARAMS, country=country)
+        if category:
+            self.params["category"] = category
+        self.name = f"{country}/{category or 'all'}"
+
+    def fetch(self):
+        return get_page(URL, self.params)
+
+    def parse(self, payload):
+        return newsapi_articles(json.loads(payload))
+
+class FeedSource:
+    """An RSS 2.0 or Atom feed, from a URL or a local file."""
+
+    ATOM = "{http://www.w3.org/2005/Atom}"
+
+    def __init__(self, location):
+        self.location = location
+        self.name = location
+
+    def fetch(self):
+        if self.location.startswith(("http://", "https://")):
+            return get_page(self.location)
+        return read_file(self.location)
 
-        articles = data.get("articles", [])
-        if not articles:
-            print("No news found.")
+    def parse(self, payload):
+        root = ET.fromstring(payload)
+        channel = root.find("channel")
+        if channel is not None:  # RSS
+            feed_title = channel.findtext("title")
+            return [article(item.findtext("link"), item.findtext("title"), feed_title,
+                            self.rss_date(item.findtext("pubDate")))
+                    for item in channel.iter("item")]
+        feed_title = root.findtext(self.ATOM + "title")
+        articles = []
+        for entry in root.iter(self.ATOM + "entry"):
+            links = entry.findall(self.ATOM + "link")
+            link = next((l.get("href") for l in links if l.get("rel", "alternate") == "alternate"), None)
+            published = entry.findtext(self.ATOM + "published") or entry.findtext(self.ATOM + "updated")
+            articles.append(article(link, entry.findtext(self.ATOM + "title"), feed_title, published))
+        return articles
+
+    @staticmethod
+    def rss_date(value):
+        try:
+            return parsedate_to_datetime(value).isoformat()
+        except (TypeError, ValueError):
+            return value
+
+class JsonFileSource:
+    """A local JSON file shaped like a NewsAPI response."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = path
+
+    def fetch(self):
+        return read_file(self.path)
+
+    def parse(self, payload):
+        return newsapi_articles(json.loads(payload))
+
+def build_sources():
+    """Every configured source: one per country/category pair, feed and JSON file."""
+    sources = [NewsAPISource(country, category) for country in COUNTRIES for category in CATEGORIES]
+    sources += [FeedSource(location) for location in FEEDS]
+    sources += [JsonFileSource(path) for path in JSON_FILES]
+    return sources
+
+# ===========================
+# SINKS
+# ===========================
+# A sink has a write(articles) that receives each batch of new articles once.
+# Batches can arrive from several writer threads, so each sink locks itself.
+class MarkdownSink:
+    def __init__(self, path=NEWS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, articles):
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(md_entry(a) for a in articles)
+
+class JsonlSink:
+    def __init__(self, path=JSONL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, articles):
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(a, ensure_ascii=False) + "\n" for a in articles)
+
+class SqliteSink:
+    """Saves articles to the article store, which dedupe checks on later runs."""
+
+    def write(self, articles):
+        db = get_db()
+        fetched_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        with _db_lock, db:
+            db.executemany("""
+                INSERT OR IGNORE INTO articles (url, title, source, published_at, fetched_at, query)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(a["url"], a["title"], a["source"], a["published_at"], fetched_at, a["query"])
+                  for a in articles])
+
+SINKS = [SqliteSink(), MarkdownSink()]  # add JsonlSink() for a JSON Lines copy
+
+# ===========================
+# PIPELINE
+# ===========================
+DONE = object()  # end of stream marker passed down the queues
+
+async def fetch_source(source, semaphore):
+    """Fetches one source, retrying transient failures with exponential backoff."""
+    for attempt in range(RETRIES + 1):
+        try:
+            async with semaphore:
+                return await asyncio.to_thread(source.fetch)
+        except (requests.Timeout, requests.ConnectionError, RetryableError) as e:
+            if attempt == RETRIES:
+                raise
+            delay = getattr(e, "retry_after", None) or BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"Retrying {source.name} in {delay:.1f}s ({e})")
+            await asyncio.sleep(delay)
+
+async def fetch_all(sources, outbox):
+    """Source stage: fetches every source concurrently, at most MAX_CONCURRENCY at a time.
+
+    Each payload is put on outbox as soon as it arrives; a full queue holds
+    back further fetches until the parsers catch up.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def fetch_one(source):
+        try:
+            payload = await fetch_source(source, semaphore)
+        except Exception as e:
+            print(f"Error fetching {source.name}:", e)
+            return
+        if payload is None:
+            print(f"📰 {source.name}: unchanged")
             return
+        await asyncio.to_thread(outbox.put, (source, payload))
+
+    await asyncio.gather(*(fetch_one(source) for source in sources))
+
+def run_stage(pool, inbox, outbox, work, workers):
+    """Starts workers that take items from inbox, call work on them and put
+    what it returns (unless None) on outbox. DONE is passed on once all
+    workers have seen it."""
+    remaining = [workers]
+    lock = threading.Lock()
 
-        # Pick a random news article from the list
-        latest = random.choice(articles)
-        title = latest['title']
-        url = latest['url']
+    def worker():
+        while True:
+            item = inbox.get()
+            if item is DONE:
+                inbox.put(DONE)  # let the other workers of this stage see it too
+                break
+            try:
+                result = work(item)
+            except Exception as e:
+                print("Error:", e)
+                continue
+            if result is not None and outbox is not None:
+                outbox.put(result)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0 and outbox is not None:
+                outbox.put(DONE)
+
+    return [pool.submit(worker) for _ in range(workers)]
+
+def run_pipeline(sources, sinks):
+    """Runs sources -> normalize -> dedupe -> sinks once and returns the number of new articles.
+
+    Parsing and writing use PARSE_WORKERS and WRITE_WORKERS threads; dedupe
+    is a single thread so two copies of a URL in the same run are caught.
+    """
+    fetched, parsed, fresh = (queue.Queue(QUEUE_SIZE) for _ in range(3))
+    seen = set()  # URLs of this run, not yet in the store when dedupe sees the next copy
+    added = [0]
 
-        # Save the article to the Markdown file
-        print(f"📰 News added: {title}")
-        print(f"URL: {url}\n")
-        save_news_md(title, url)
+    def normalize(item):
+        source, payload = item
+        articles = [a for a in source.parse(payload) if a["url"]]
+        for a in articles:
+            a["query"] = source.name
+        return source.name, articles
 
+    def dedupe(item):
+        name, articles = item
+        db = get_db()
+        new = []
+        with _db_lock:
+            for a in articles:
+                if a["url"] in seen or db.execute("SELECT 1 FROM articles WHERE url = ?", (a["url"],)).fetchone():
+                    continue
+                seen.add(a["url"])
+                new.append(a)
+        print(f"📰 {name}: {len(new)} new of {len(articles)} article(s)")
+        added[0] += len(new)
+        return new or None
+
+    def write(articles):
+        for sink in sinks:
+            sink.write(articles)
+
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS + 1 + WRITE_WORKERS) as pool:
+        stages = run_stage(pool, fetched, parsed, normalize, PARSE_WORKERS)
+        stages += run_stage(pool, parsed, fresh, dedupe, 1)
+        stages += run_stage(pool, fresh, None, write, WRITE_WORKERS)
+        try:
+            asyncio.run(fetch_all(sources, fetched))
+        finally:
+            fetched.put(DONE)
+        for stage in stages:
+            stage.result()
+    return added[0]
+
+def fetch_news():
+    """Fetch headlines from every source, keep the articles not seen before and add them to the sinks.
+
+    Returns the number of new articles.
+    """
+    if any(isinstance(sink, MarkdownSink) for sink in SINKS) and not os.path.exists(NEWS_FILE):
+        rebuild_news_md()
+    try:
+        added = run_pipeline(build_sources(), SINKS)
     except Exception as e:
         print("Error:", e)
+        return 0
+    if added:
+        print(f"{added} new article(s) saved\n")
+    return added
+
+_interval = MIN_INTERVAL
 
-# Schedule fetching news every 1 minutes
-schedule.every(1).minutes.do(fetch_news)
+def poll():
+    """Runs fetch_news and schedules the next run based on what it found."""
+    global _interval
+    if fetch_news():
+        _interval = max(MIN_INTERVAL, _interval // 2)
+    else:
+        _interval = min(MAX_INTERVAL, int(_interval * 1.5))
+    print(f"Next check in {_interval}s (cache: {CACHE_STATS['hit']} hit(s), "
+          f"{CACHE_STATS['revalidated']} revalidated, {CACHE_STATS['miss']} miss(es))")
+    schedule.every(_interval).seconds.do(poll)
+    return schedule.CancelJob  # replaced by the job scheduled above
 
-print("Starting news reader... 📰")
-fetch_news()  # Run once at start
+if __name__ == "__main__":
+    print("Starting news reader... 📰")
+    poll()  # Run once at start, then at an interval that follows the news flow
 
-# Keep the script running
-while True:
-    schedule.run_pending()
-    time.sleep(1)
+    # Keep the script running
+    while True:
+        schedule.run_pending()
+        time.sleep(1)